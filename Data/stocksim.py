@@ -39,12 +39,19 @@ def minutes_to_str(m):
     seconds = frac * 60
     return "%02d:%02d.%02.f" % (hours,minutes,seconds)
 
+# Strip the quotes from a string field
+def unquote(s):
+    return s[1:-1] if s[:1] == '"' else s
+
+# Column conversions for the history file (name,price,date,time,change,open,high,low,volume)
+history_types = [unquote, float, unquote, unquote, float, float, float, float, int]
+
 # Read the stock history file as a list of lists
 def read_history(filename):
     result = []
     for line in open(filename):
         str_fields = line.strip().split(",")
-        fields = [eval(x) for x in str_fields]
+        fields = [func(x) for func, x in zip(history_types, str_fields)]
         fields[3] = minutes(fields[3])
         result.append(fields)
     return result
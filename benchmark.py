@@ -0,0 +1,273 @@
+"""
+Repeatable benchmarks for the data readers.
+
+Each suite runs every reader on the same input, after some warmup runs,
+and reports the best and median time of several repeats plus the peak
+memory of one extra run traced with tracemalloc. Results can be saved as
+JSON to track trends across changes:
+
+    python benchmark.py readrides --rows 200000 --repeat 5 --json bench.json
+"""
+
+import argparse
+import csv
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+from sys import intern
+
+import reader
+import readrides
+import tableformat
+
+
+def make_rides_csv(filename, nrows, seed=0):
+    """
+    Write a synthetic file with the same layout as Data/ctabus.csv
+    """
+    rand = random.Random(seed)
+    routes = [str(n) for n in range(1, 180)]
+    with open(filename, "w") as f:
+        f.write("route,date,daytype,rides\n")
+        for _ in range(nrows):
+            f.write(
+                "%s,%02d/%02d/%d,%s,%d\n"
+                % (
+                    rand.choice(routes),
+                    rand.randint(1, 12),
+                    rand.randint(1, 28),
+                    rand.randint(2001, 2011),
+                    rand.choice("UAW"),
+                    rand.randint(0, 25000),
+                )
+            )
+
+
+def consume(iterable):
+    deque(iterable, maxlen=0)
+
+
+# Every record representation in readrides, keyed by a short name
+readers = {
+    "tuples": readrides.read_rides_as_tuples,
+    "named_tuples": readrides.read_rides_as_named_tuples,
+    "instances": readrides.read_rides_as_instances,
+    "instances_with_slots": readrides.read_rides_as_instances_with_slots,
+    "dicts": readrides.read_rides_as_dicts,
+    "generator": lambda filename: consume(readrides.read_rides_as_generator(filename)),
+    "columns": readrides.read_rides_as_columns,
+    "data_collection": lambda filename: readrides.read_rides_as_data_collection(
+        filename, [intern, intern, intern, int]
+    ),
+    "typed_columns": lambda filename: readrides.read_csv_as_columns(
+        filename, [str, str, str, int]
+    ),
+}
+
+
+def measure(func, *args, repeat=5, warmup=1):
+    """
+    Time func(*args) and measure its peak memory use
+    """
+    for _ in range(warmup):
+        func(*args)
+
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+        del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = func(*args)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return {
+        "best": min(times),
+        "median": statistics.median(times),
+        "memory": current,
+        "peak_memory": peak,
+    }
+
+
+def run_suite(cases, args, *fargs):
+    results = []
+    for name, func in cases.items():
+        if args.only and name not in args.only:
+            continue
+        result = {"name": name}
+        result.update(measure(func, *fargs, repeat=args.repeat, warmup=args.warmup))
+        results.append(result)
+        print(
+            "%-22s %9.4fs %9.4fs %12d %12d"
+            % (
+                name,
+                result["best"],
+                result["median"],
+                result["memory"],
+                result["peak_memory"],
+            )
+        )
+    return results
+
+
+def bench_readrides(args):
+    """
+    Compare the record representations in readrides
+    """
+    if args.data:
+        return run_suite(readers, args, args.data)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "rides.csv")
+        make_rides_csv(filename, args.rows, args.seed)
+        return run_suite(readers, args, filename)
+
+
+def _tokenize(tokenizer):
+    def run(filename):
+        with reader.open_csv(filename) as f:
+            consume(tokenizer(f))
+
+    return run
+
+
+# CSV tokenizers on their own, then as used by the readers
+tokenizers = {
+    "csv_reader": _tokenize(csv.reader),
+    "fast_csv_reader": _tokenize(reader.fast_csv_reader),
+    "dicts": lambda filename: reader.read_csv_as_dicts(filename, [str, str, str, int]),
+    "dicts_fast": lambda filename: reader.read_csv_as_dicts(
+        filename, [str, str, str, int], fast=True
+    ),
+    "columns": lambda filename: readrides.read_csv_as_columns(
+        filename, [str, str, str, int]
+    ),
+    "columns_fast": lambda filename: readrides.read_csv_as_columns(
+        filename, [str, str, str, int], fast=True
+    ),
+}
+
+
+def bench_tokenizer(args):
+    """
+    Compare csv.reader with fast_csv_reader on quote-free data
+    """
+    if args.data:
+        return run_suite(tokenizers, args, args.data)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "rides.csv")
+        make_rides_csv(filename, args.rows, args.seed)
+        return run_suite(tokenizers, args, filename)
+
+
+def make_portfolio(nrows, seed=0):
+    """
+    Create portfolio-style records as dicts
+    """
+    rand = random.Random(seed)
+    names = ["AA", "IBM", "CAT", "MSFT", "GE", "GOOG", "HPQ"]
+    return [
+        {
+            "name": rand.choice(names),
+            "shares": rand.randint(1, 1000),
+            "price": rand.uniform(10, 500),
+        }
+        for _ in range(nrows)
+    ]
+
+
+class NullWriter:
+    def write(self, s):
+        return len(s)
+
+
+def _render(name, compiled):
+    def run(records):
+        formatter = tableformat.create_formatter(
+            name, column_formats=["%s", "%d", "%0.2f"], out=NullWriter()
+        )
+        formatter.compile_rows = compiled
+        tableformat.print_table(records, ["name", "shares", "price"], formatter)
+
+    return run
+
+
+# Each formatter through the mixin row() chain and with a compiled row
+formatters = {
+    f"{name}{suffix}": _render(name, compiled)
+    for name in ("text", "csv", "html")
+    for suffix, compiled in (("", False), ("_compiled", True))
+}
+
+
+def bench_formatters(args):
+    """
+    Compare rendering rows with the row() methods and compiled rows
+    """
+    return run_suite(formatters, args, make_portfolio(args.rows, args.seed))
+
+
+suites = {
+    "readrides": bench_readrides,
+    "tokenizer": bench_tokenizer,
+    "formatters": bench_formatters,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("suites", nargs="*", help="suites to run (default: all)")
+    parser.add_argument(
+        "--rows", type=int, default=100000, help="rows of synthetic data"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed for synthetic data")
+    parser.add_argument(
+        "--data", help="use an existing data file instead of synthetic data"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs per case")
+    parser.add_argument(
+        "--only", type=lambda s: s.split(","), help="comma separated cases to run"
+    )
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+    for name in args.suites:
+        if name not in suites:
+            parser.error(
+                "unknown suite %s (choose from %s)" % (name, ", ".join(suites))
+            )
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "rows": args.rows,
+        "data": args.data,
+        "repeat": args.repeat,
+        "results": {},
+    }
+    for name in args.suites or suites:
+        print("%-22s %10s %10s %12s %12s" % (name, "best", "median", "memory", "peak"))
+        report["results"][name] = suites[name](args)
+        print()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -51,7 +51,7 @@ def negchange(target):
 
 @consumer
 def ticker(fmt, fields):
-    formatter = create_formatter(fmt)
+    formatter = create_formatter(fmt, flush_size=0)
     formatter.headings(fields)
     while True:
         rec = yield
@@ -4,7 +4,6 @@ from pprint import pprint
 import tracemalloc
 from collections import Counter, defaultdict
 
-from sys import intern
 from reader import read_csv_as_dicts
 
 
@@ -12,7 +11,9 @@ def solutions():
     from collections import defaultdict, Counter
 
     solution_rows = read_file_as_type(
-        type_name="data_collection", converters=[intern, intern, intern, int]
+        type_name="data_collection",
+        converters=[str, str, str, int],
+        categorical=["route", "date", "daytype"],
     )
 
     # --------------------------------------------------
@@ -80,7 +81,8 @@ by_route_date = {}
 rows = read_file_as_type(
     filename="Data/ctabus.csv",
     type_name="data_collection",
-    converters=[intern, intern, intern, int],
+    converters=[str, str, str, int],
+    categorical=["route", "date", "daytype"],
 )
 
 status = 0
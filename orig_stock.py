@@ -1,6 +1,6 @@
 from pprint import pprint
 import sys
-from sys import intern, stdout
+from sys import stdout
 from decimal import Decimal
 from colored import Fore, Back, Style
 
@@ -81,17 +81,7 @@ class DStock(Stock):
 
 
 def read_portfolio(filename="Data/portfolio.csv", cls=Stock):
-    rows = reader.read_file_as_type(
-        filename=filename,
-        type_name="data_collection",
-        converters=[intern, int, float],
-    )
-
-    stocks = list()
-
-    for row in rows:
-        result = cls.from_row(row)
-        stocks.append(result)
+    stocks = reader.read_csv_as_instances(filename, cls, categorical=["name"])
 
     # final = [Stock(name, shares, price) for (name, shares, price) in rows]
 
@@ -1,55 +1,769 @@
+import bz2
 import csv
+import gzip
+import io
 import logging
+import lzma
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from itertools import chain, islice, repeat
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 log = logging.getLogger(__name__)
 
 
-def convert_csv(lines, converter, *, headers=None):
-    rows = csv.reader(lines)
+class BadRowSink:
+    """
+    Receives the rows that fail conversion. Converting a clean file never
+    touches the sink. finish() is called when a conversion is complete.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def add(self, rowno, row, error):
+        self.count += 1
+
+    def finish(self):
+        pass
+
+
+class LogSink(BadRowSink):
+    """
+    Log a warning for every bad row. This is the default.
+    """
+
+    def add(self, rowno, row, error):
+        super().add(rowno, row, error)
+        log.warning("Row %s: Bad row: %s", rowno, row)
+        log.debug("Row %s: Reason: %s", rowno, error)
+
+
+class CountingSink(BadRowSink):
+    """
+    Only count bad rows, logging a single summary at the end
+    """
+
+    def finish(self):
+        if self.count:
+            log.warning("%d bad rows", self.count)
+
+
+class SamplingSink(BadRowSink):
+    """
+    Log the first limit bad rows, then only count the rest
+    """
+
+    def __init__(self, limit=10):
+        super().__init__()
+        self.limit = limit
+
+    def add(self, rowno, row, error):
+        super().add(rowno, row, error)
+        if self.count <= self.limit:
+            log.warning("Row %s: Bad row: %s: %s", rowno, row, error)
+
+    def finish(self):
+        if self.count > self.limit:
+            log.warning("%d more bad rows not shown", self.count - self.limit)
+
+
+class QuarantineSink(BadRowSink):
+    """
+    Write bad rows to a CSV file as (row number, reason, *fields), in
+    batches of batch_size rows. The file is only created if a bad row
+    turns up. Use as a context manager or call close() when done.
+    """
+
+    def __init__(self, filename, batch_size=1000):
+        super().__init__()
+        self.filename = filename
+        self.batch_size = batch_size
+        self._batch = []
+        self._file = None
+
+    def add(self, rowno, row, error):
+        super().add(rowno, row, error)
+        self._batch.append([rowno, str(error), *row])
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._batch:
+            if self._file is None:
+                self._file = open(self.filename, "w", newline="")
+                self._writer = csv.writer(self._file)
+            self._writer.writerows(self._batch)
+            self._batch.clear()
+
+    finish = flush
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, ty, val, tb):
+        self.close()
+
+
+class SymbolTable:
+    """
+    The distinct values of a categorical column. Each value is stored
+    once and given an integer code. values counts the fields looked up.
+    """
+
+    def __init__(self):
+        self.symbols = []
+        self.lookup = {}
+        self.values = 0
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __repr__(self):
+        return "SymbolTable(%d symbols, %d values)" % (len(self.symbols), self.values)
+
+    def code(self, value):
+        code = self.lookup.get(value)
+        if code is None:
+            code = self.lookup[value] = len(self.symbols)
+            self.symbols.append(value)
+        return code
+
+    def intern(self, value):
+        """
+        Return the stored copy of value, adding it if it's new
+        """
+        self.values += 1
+        return self.symbols[self.code(value)]
+
+    def merge(self, other):
+        for symbol in other.symbols:
+            self.code(symbol)
+        self.values += other.values
+
+    def stats(self):
+        return {
+            "symbols": len(self.symbols),
+            "values": self.values,
+            "cardinality": len(self.symbols) / self.values if self.values else 0.0,
+        }
+
+
+def symbol_tables(categorical):
+    """
+    Turn a categorical= argument into a dict of column name to
+    SymbolTable. A dict of tables is used as is, so callers can read
+    the stats afterwards or share tables between loads.
+    """
+    if categorical is None or isinstance(categorical, dict):
+        return categorical
+    return {name: SymbolTable() for name in categorical}
+
+
+def _interned_rows(rows, headers, tables):
+    """
+    Replace the fields of categorical columns with their stored copies
+    """
+    columns = [
+        (n, tables[name].intern) for n, name in enumerate(headers) if name in tables
+    ]
+    for row in rows:
+        for n, intern in columns:
+            if n < len(row):
+                row[n] = intern(row[n])
+        yield row
+
+
+def iter_convert_csv(
+    lines, converter, *, headers=None, bad_rows=None, categorical=None, tokenizer=None
+):
+    """
+    Lazily convert CSV lines, yielding one converted record at a time.
+    Rows that raise ValueError are passed to the bad_rows sink. Fields
+    of categorical columns are interned in a symbol table before they
+    are converted, so repeated values share one object. tokenizer splits
+    lines into rows and defaults to csv.reader.
+    """
+    if bad_rows is None:
+        bad_rows = LogSink()
+    rows = (tokenizer or csv.reader)(lines)
 
     if headers is None:
-        headers = next(rows)
+        headers = next(rows, None)
+        if headers is None:
+            return
+
+    tables = symbol_tables(categorical)
+    if tables:
+        rows = _interned_rows(rows, headers, tables)
 
-    records = []
     for rowno, row in enumerate(rows, start=1):
         try:
-            records.append(converter(headers, row))
+            yield converter(headers, row)
         except ValueError as e:
-            log.warning("Row %s: Bad row: %s", rowno, row)
-            log.debug("Row %s: Reason: %s", rowno, row)
-    return records
+            bad_rows.add(rowno, row, e)
+    bad_rows.finish()
+
+
+def convert_csv(
+    lines, converter, *, headers=None, bad_rows=None, categorical=None, tokenizer=None
+):
+    return list(
+        iter_convert_csv(
+            lines,
+            converter,
+            headers=headers,
+            bad_rows=bad_rows,
+            categorical=categorical,
+            tokenizer=tokenizer,
+        )
+    )
     # return list(map(lambda row: converter(headers, row), rows))
 
 
-def csv_as_dicts(lines, types, *, headers=None):
-    return convert_csv(
+# Per-column converters for what used to need eval() or a lambda. Plain
+# numbers should use the builtins int() and float() directly.
+symbol = sys.intern
+
+
+def unquote(s):
+    """
+    Strip one pair of surrounding double quotes, as left by str.split(",")
+    """
+    if s[:1] == '"' and s[-1:] == '"':
+        return s[1:-1]
+    return s
+
+
+def empty_none(s):
+    return s or None
+
+
+class optional:
+    """
+    Wrap a converter so that empty fields become None. Converters
+    compiled by make_dict_converter test for the empty field inline.
+    """
+
+    __slots__ = ("func",)
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, s):
+        return self.func(s) if s else None
+
+    def __eq__(self, other):
+        return type(other) is optional and other.func == self.func
+
+    def __hash__(self):
+        return hash((optional, self.func))
+
+    def __repr__(self):
+        return f"optional({getattr(self.func, '__name__', self.func)})"
+
+
+def infer_types(rows, headers=None):
+    """
+    Pick a converter for each column from a sample of rows. Columns that
+    parse as int or float get those, wrapped in optional() if some fields
+    are empty. Other columns are str, or symbol if values repeat.
+    """
+    ncols = len(headers) if headers is not None else max(map(len, rows), default=0)
+    types = []
+    for n in range(ncols):
+        column = [row[n] for row in rows if len(row) > n]
+        values = [v for v in column if v]
+        for func in (int, float):
+            try:
+                for v in values:
+                    func(v)
+            except ValueError:
+                continue
+            if values:
+                types.append(optional(func) if len(values) < len(column) else func)
+                break
+        else:
+            types.append(symbol if len(set(values)) * 2 <= len(values) else str)
+    return types
+
+
+def infer_csv_types(filename, sample=1000, *, headers=None):
+    """
+    Read the headers and the first sample rows of a CSV file and infer
+    the column converters. Returns (headers, types).
+    """
+    with open_csv(filename) as file:
+        rows = csv.reader(file)
+        if headers is None:
+            headers = next(rows, [])
+        rows = list(islice(rows, sample))
+    return headers, infer_types(rows, headers)
+
+
+def make_dict_converter(headers, types):
+    """
+    Create a function that turns a row into a dict. The per-column
+    conversions are unrolled into straight-line code that is built once
+    and cached for each header/type schema. Empty-field tests for
+    optional() converters are inlined.
+    """
+    headers, types = tuple(headers), tuple(types)
+    try:
+        return _cached_dict_converter(headers, types)
+    except TypeError:
+        # Unhashable converters can't be cache keys
+        return _compile_dict_converter(headers, types)
+
+
+def _compile_dict_converter(headers, types):
+    ncols = min(len(headers), len(types))
+    items = []
+    for n in range(ncols):
+        if type(types[n]) is optional:
+            items.append(f"_h{n}: _t{n}(row[{n}]) if row[{n}] else None")
+        else:
+            items.append(f"_h{n}: _t{n}(row[{n}])")
+    items = ", ".join(items)
+    code = (
+        "def convert(row):\n"
+        f"    if len(row) < {ncols}:\n"
+        "        return {name: func(val) for name, func, val in zip(_headers, _types, row)}\n"
+        f"    return {{{items}}}\n"
+    )
+    locs = {"_headers": headers, "_types": types}
+    for n in range(ncols):
+        locs[f"_h{n}"] = headers[n]
+        func = types[n]
+        locs[f"_t{n}"] = func.func if type(func) is optional else func
+    exec(code, locs)
+    return locs["convert"]
+
+
+# Bounded, since callers passing a fresh lambda per call never hit the cache
+_cached_dict_converter = lru_cache(maxsize=128)(_compile_dict_converter)
+
+
+def iter_csv_as_dicts(
+    lines, types, *, headers=None, bad_rows=None, categorical=None, tokenizer=None
+):
+    convert = None
+
+    def converter(headers, row):
+        nonlocal convert
+        if convert is None:
+            convert = make_dict_converter(headers, types)
+        return convert(row)
+
+    return iter_convert_csv(
         lines,
-        lambda headers, row: {
-            name: func(val) for name, func, val in zip(headers, types, row)
-        },
+        converter,
         headers=headers,
+        bad_rows=bad_rows,
+        categorical=categorical,
+        tokenizer=tokenizer,
     )
 
 
-def csv_as_instances(lines, cls, *, headers=None):
-    return convert_csv(
+def csv_as_dicts(
+    lines, types, *, headers=None, bad_rows=None, categorical=None, tokenizer=None
+):
+    return list(
+        iter_csv_as_dicts(
+            lines,
+            types,
+            headers=headers,
+            bad_rows=bad_rows,
+            categorical=categorical,
+            tokenizer=tokenizer,
+        )
+    )
+
+
+def iter_csv_as_instances(
+    lines, cls, *, headers=None, bad_rows=None, categorical=None, tokenizer=None
+):
+    return iter_convert_csv(
         lines,
         lambda headers, row: cls.from_row(row),
         headers=headers,
+        bad_rows=bad_rows,
+        categorical=categorical,
+        tokenizer=tokenizer,
+    )
+
+
+def csv_as_instances(
+    lines, cls, *, headers=None, bad_rows=None, categorical=None, tokenizer=None
+):
+    return list(
+        iter_csv_as_instances(
+            lines,
+            cls,
+            headers=headers,
+            bad_rows=bad_rows,
+            categorical=categorical,
+            tokenizer=tokenizer,
+        )
     )
 
 
-def read_csv_as_dicts(filename, types, *, headers=None):
+def read_csv_as_dicts(
+    filename,
+    types=None,
+    *,
+    headers=None,
+    workers=None,
+    bad_rows=None,
+    categorical=None,
+    fast=False,
+):
+    """
+    Read CSV data into a list of dictionaries with optional type conversion.
+    If types is None they are inferred from the start of the file. If
+    workers is given, rows are converted in that many processes, except
+    for compressed files, which are always read serially. If fast is
+    true, rows are split with fast_csv_reader.
+    """
+    if types is None:
+        _, types = infer_csv_types(filename, headers=headers)
+    if workers and not is_compressed(filename):
+        return parallel_convert_csv(
+            filename,
+            partial(make_dict_converter, types=types),
+            headers=headers,
+            workers=workers,
+            bad_rows=bad_rows,
+            categorical=categorical,
+            fast=fast,
+        )
+    with open_csv(filename) as file:
+        return csv_as_dicts(
+            file,
+            types,
+            headers=headers,
+            bad_rows=bad_rows,
+            categorical=categorical,
+            tokenizer=fast_csv_reader if fast else None,
+        )
+
+
+def read_csv_as_instances(
+    filename,
+    cls,
+    *,
+    headers=None,
+    workers=None,
+    bad_rows=None,
+    categorical=None,
+    fast=False,
+):
     """
-    Read CSV data into a list of dictionaries with optional type conversion
+    Read CSV data into a list of instances. If workers is given, rows are
+    converted in that many processes, except for compressed files. If
+    fast is true, rows are split with fast_csv_reader.
     """
-    with open(filename) as file:
-        return csv_as_dicts(file, types, headers=headers)
+    if workers and not is_compressed(filename):
+        return parallel_convert_csv(
+            filename,
+            partial(_instance_converter, cls),
+            headers=headers,
+            workers=workers,
+            bad_rows=bad_rows,
+            categorical=categorical,
+            fast=fast,
+        )
+    with open_csv(filename) as file:
+        return csv_as_instances(
+            file,
+            cls,
+            headers=headers,
+            bad_rows=bad_rows,
+            categorical=categorical,
+            tokenizer=fast_csv_reader if fast else None,
+        )
 
 
-def read_csv_as_instances(filename, cls, *, headers=None):
+def iter_read_csv_as_dicts(
+    filename, types=None, *, headers=None, bad_rows=None, categorical=None, fast=False
+):
+    """
+    Read CSV data as a stream of dictionaries. The file stays open
+    until the stream is exhausted or closed. If types is None they are
+    inferred from the start of the file.
+    """
+    if types is None:
+        _, types = infer_csv_types(filename, headers=headers)
+    with open_csv(filename) as file:
+        yield from iter_csv_as_dicts(
+            file,
+            types,
+            headers=headers,
+            bad_rows=bad_rows,
+            categorical=categorical,
+            tokenizer=fast_csv_reader if fast else None,
+        )
+
+
+def iter_read_csv_as_instances(
+    filename, cls, *, headers=None, bad_rows=None, categorical=None, fast=False
+):
+    """
+    Read CSV data as a stream of instances. The file stays open
+    until the stream is exhausted or closed.
     """
-    Read CSV data into a list of instances
+    with open_csv(filename) as file:
+        yield from iter_csv_as_instances(
+            file,
+            cls,
+            headers=headers,
+            bad_rows=bad_rows,
+            categorical=categorical,
+            tokenizer=fast_csv_reader if fast else None,
+        )
+
+
+# Read size for input files. Larger reads cut the number of system calls
+# and decompressor calls per row.
+BUFFER_SIZE = 1 << 20
+
+
+def _open_zstd(filename):
+    if zstandard is None:
+        raise ValueError(f"{filename}: reading .zst files needs the zstandard package")
+    return zstandard.ZstdDecompressor().stream_reader(open(filename, "rb"))
+
+
+# Binary openers for compressed files, by file suffix
+_decompressors = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+    ".lzma": lzma.open,
+    ".zst": _open_zstd,
+}
+
+
+def is_compressed(filename):
+    return os.path.splitext(filename)[1] in _decompressors
+
+
+def open_csv(filename, encoding=None):
     """
-    with open(filename) as file:
-        return csv_as_instances(file, cls, headers=headers)
+    Open a CSV file for reading as text. Files ending in .gz, .bz2, .xz
+    or .zst (if zstandard is installed) are decompressed as they're read.
+    """
+    opener = _decompressors.get(os.path.splitext(filename)[1])
+    if opener is None:
+        return open(filename, encoding=encoding, newline="", buffering=BUFFER_SIZE)
+    raw = io.BufferedReader(opener(filename), buffer_size=BUFFER_SIZE)
+    return io.TextIOWrapper(raw, encoding=encoding, newline="")
+
+
+def fast_csv_reader(file, delimiter=",", blocksize=1 << 16):
+    """
+    Drop-in replacement for csv.reader(file) on a text file. Rows are
+    split with str.split() on large blocks read from the file instead
+    of being parsed a character at a time. That's only correct without
+    quoting, so once a block containing a quote or a bare carriage
+    return turns up, the rest of the file is handed to csv.reader.
+    """
+    read = getattr(file, "read", None)
+    if read is None:
+        yield from csv.reader(file, delimiter=delimiter)
+        return
+
+    tail = ""
+    while True:
+        block = read(blocksize)
+        if not block:
+            break
+        block = tail + block
+        text = block.replace("\r\n", "\n") if "\r" in block else block
+        # A carriage return at the very end may be half of a CRLF that was
+        # split between reads, so it's judged along with the next block
+        if '"' in text or "\r" in text[:-1]:
+            # csv.reader gets the text as read, so quoted line breaks keep
+            # their carriage returns
+            rest = io.StringIO(block + file.readline(), newline="")
+            yield from csv.reader(chain(rest, file), delimiter=delimiter)
+            return
+        end = text.rfind("\n") + 1
+        tail = text[end:]
+        text = text[:end]
+        lines = text.split("\n")
+        lines.pop()
+        if "\n\n" in text or text[:1] == "\n":
+            yield from (line.split(delimiter) if line else [] for line in lines)
+        else:
+            yield from map(str.split, lines, repeat(delimiter))
+    if tail:
+        yield from csv.reader(io.StringIO(tail, newline=""), delimiter=delimiter)
+
+
+def chunk_ranges(filename, nchunks, start=0):
+    """
+    Split a file into at most nchunks (start, stop) byte ranges, each
+    ending on a line boundary
+    """
+    size = os.path.getsize(filename)
+    bounds = [start]
+    with open(filename, "rb") as f:
+        for n in range(1, nchunks):
+            offset = start + (size - start) * n // nchunks
+            if offset <= bounds[-1]:
+                continue
+            f.seek(offset - 1)
+            f.readline()
+            offset = f.tell()
+            if offset >= size:
+                break
+            if offset > bounds[-1]:
+                bounds.append(offset)
+    if size > bounds[-1]:
+        bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def open_chunk(filename, start, stop, encoding=None):
+    """
+    Open the byte range [start, stop) of a file as a text stream
+    """
+    with open(filename, "rb") as f:
+        f.seek(start)
+        data = f.read(stop - start)
+    return io.TextIOWrapper(io.BytesIO(data), encoding=encoding)
+
+
+def read_headers(filename, encoding=None):
+    """
+    Read the header row of a CSV file. Returns the headers and the byte
+    offset where the data rows start.
+    """
+    with open(filename, "rb") as f:
+        line = f.readline()
+        start = f.tell()
+    headers = next(
+        csv.reader(io.TextIOWrapper(io.BytesIO(line), encoding=encoding)), []
+    )
+    return headers, start
+
+
+def _convert_chunk(
+    filename, start, stop, encoding, headers, make_converter, categorical, fast
+):
+    """
+    Convert the rows of one chunk in a worker process. Bad rows are sent
+    back to the parent to be reported with their final row numbers, and
+    the chunk's symbol tables are sent back to be merged.
+    """
+    convert = make_converter(headers)
+    records = []
+    bad = []
+    rowno = 0
+    tokenizer = fast_csv_reader if fast else csv.reader
+    rows = tokenizer(open_chunk(filename, start, stop, encoding))
+    tables = symbol_tables(categorical)
+    if tables:
+        rows = _interned_rows(rows, headers, tables)
+    for rowno, row in enumerate(rows, start=1):
+        try:
+            records.append(convert(row))
+        except ValueError as e:
+            bad.append((rowno, row, e))
+    return records, bad, rowno, tables
+
+
+def _share_symbols(records, tables):
+    """
+    Replace the categorical fields of records sent back by a worker,
+    which are that worker's own copies, with the stored copies in tables
+    """
+    fields = [(name, table.lookup, table.symbols) for name, table in tables.items()]
+    for record in records:
+        if isinstance(record, dict):
+            for name, lookup, symbols in fields:
+                code = lookup.get(record.get(name))
+                if code is not None:
+                    record[name] = symbols[code]
+        else:
+            for name, lookup, symbols in fields:
+                code = lookup.get(getattr(record, name, None))
+                if code is not None:
+                    setattr(record, name, symbols[code])
+
+
+def parallel_convert_csv(
+    filename,
+    make_converter,
+    *,
+    headers=None,
+    workers=None,
+    encoding=None,
+    bad_rows=None,
+    categorical=None,
+    fast=False,
+):
+    """
+    Convert a CSV file using a pool of worker processes. The file is split
+    into chunks at line boundaries, so quoted values must not contain
+    newlines. make_converter(headers) must be picklable and return a
+    function that converts a single row. The symbol tables of each chunk
+    are merged into the caller's tables, and categorical fields of the
+    records are swapped for the caller's copies so that values are shared
+    across chunks.
+    """
+    if is_compressed(filename):
+        raise ValueError(f"{filename}: compressed files can't be split into chunks")
+    tables = symbol_tables(categorical)
+    if bad_rows is None:
+        bad_rows = LogSink()
+    file_headers, start = read_headers(filename, encoding)
+    if headers is None:
+        headers = file_headers
+    else:
+        start = 0
+
+    workers = workers or os.cpu_count()
+    ranges = chunk_ranges(filename, workers * 4, start)
+    records = []
+    rowbase = 0
+    with ProcessPoolExecutor(workers) as pool:
+        results = pool.map(
+            _convert_chunk,
+            repeat(filename),
+            [lo for lo, hi in ranges],
+            [hi for lo, hi in ranges],
+            repeat(encoding),
+            repeat(headers),
+            repeat(make_converter),
+            repeat(list(tables) if tables else None),
+            repeat(fast),
+        )
+        for chunk, bad, nrows, chunk_tables in results:
+            records.extend(chunk)
+            if chunk_tables:
+                for name, table in chunk_tables.items():
+                    tables[name].merge(table)
+                _share_symbols(chunk, tables)
+            for rowno, row, error in bad:
+                bad_rows.add(rowbase + rowno, row, error)
+            rowbase += nrows
+    bad_rows.finish()
+    return records
+
+
+def _instance_converter(cls, headers):
+    return cls.from_row
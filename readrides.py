@@ -1,30 +1,616 @@
 import csv
+import json
+import mmap
+import os
+import pickle
+import sys
+import tempfile
 import tracemalloc
+from bisect import bisect_left, bisect_right
+from array import array
 from collections.abc import Sequence
 from collections import namedtuple, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import compress, islice, repeat
+from operator import itemgetter
+
+from reader import (
+    chunk_ranges,
+    fast_csv_reader,
+    is_compressed,
+    open_chunk,
+    open_csv,
+    read_headers,
+    symbol_tables,
+)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class DataCollection(Sequence):
-    def __init__(self, columns):
+    def __init__(self, columns, index=None):
         self.column_names = list(columns)
         self.column_data = list(columns.values())
+        # Row positions into the shared column data when this collection
+        # is a view, or None if it covers every row
+        self._index = index
 
     def __len__(self):
-        return len(self.column_data.values()[0])
+        if self._index is not None:
+            return len(self._index)
+        return len(self.column_data[0]) if self.column_data else 0
 
     def __getitem__(self, key):
         if isinstance(key, slice):
-            slicer = DataCollection()
-            slicer.column_data = {
-                header: data_list[key] for header, data_list in self.column_data.items()
-            }
-            return slicer
+            return self._view(self._positions()[key])
         elif isinstance(key, int):
+            if self._index is not None:
+                key = self._index[key]
+            elif not -len(self) <= key < len(self):
+                raise IndexError("DataCollection index out of range")
             return dict(zip(self.column_names, (col[key] for col in self.column_data)))
+        elif _is_mask(key):
+            return self.compress(key)
+        else:
+            return self.take(key)
+
+    def _positions(self):
+        if self._index is None:
+            return range(len(self))
+        return self._index
+
+    def _view(self, index):
+        return DataCollection(dict(zip(self.column_names, self.column_data)), index)
+
+    def take(self, positions):
+        """
+        Return a view of the rows at the given positions
+        """
+        base = self._positions()
+        return self._view(array("q", [base[n] for n in positions]))
+
+    def compress(self, mask):
+        """
+        Return a view of the rows where mask is true
+        """
+        if len(mask) != len(self):
+            raise IndexError("Mask length does not match collection length")
+        return self._view(array("q", compress(self._positions(), mask)))
+
+    def column(self, name):
+        """
+        Return the values of a single column without copying them
+        """
+        data = self.column_data[self.column_names.index(name)]
+        if self._index is None:
+            return data
+        return ColumnView(data, self._index)
+
+    def with_column(self, name, source, func):
+        """
+        Return a collection with an extra column holding func(value) for
+        each value of the source column
+        """
+        data = self.column_data[self.column_names.index(source)]
+        if isinstance(data, CategoricalColumn):
+            derived = data.map(func)
+        else:
+            derived = [func(val) for val in data]
+        columns = dict(zip(self.column_names, self.column_data))
+        columns[name] = derived
+        return DataCollection(columns, self._index)
+
+    def group_by(self, *keys):
+        """
+        Group rows by the values of one or more columns
+        """
+        if not keys:
+            raise TypeError("Expected at least one key column")
+        return GroupBy(self, keys)
+
+    def create_index(self, *columns, kind="hash", key=None):
+        """
+        Build an index over one or more columns. A "hash" index answers
+        equality lookups, a "sorted" index also answers range queries and
+        accepts a key function to define the sort order.
+        """
+        if kind == "hash":
+            return HashIndex.build(self, columns)
+        elif kind == "sorted":
+            return SortedIndex.build(self, columns, key)
+        else:
+            raise ValueError("Unknown index kind %s" % kind)
 
     def append(self, d):
-        for key, val in d.items():
-            self.column_data[key].append(val)
+        if self._index is not None:
+            raise TypeError("Can't append to a view of a DataCollection")
+        for n, name in enumerate(self.column_names):
+            data = self.column_data[n]
+            # Columns loaded from a cache are read-only mapped pages, so
+            # copy them into arrays before the first append
+            if isinstance(data, memoryview):
+                data = self.column_data[n] = array(data.format, data.tobytes())
+            elif isinstance(getattr(data, "codes", None), memoryview):
+                data.codes = array("i", data.codes.tobytes())
+            data.append(d[name])
+
+
+def _is_mask(key):
+    """
+    Check if an indexing key is a sequence of booleans
+    """
+    dtype = getattr(key, "dtype", None)
+    if dtype is not None:
+        return dtype.kind == "b"
+    return len(key) > 0 and isinstance(key[0], bool)
+
+
+class ColumnView(Sequence):
+    """
+    Read-only view of selected rows of a column
+    """
+
+    def __init__(self, data, index):
+        self.data = data
+        self.index = index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return ColumnView(self.data, self.index[key])
+        return self.data[self.index[key]]
+
+    def __iter__(self):
+        data = self.data
+        return (data[n] for n in self.index)
+
+
+class CategoricalColumn(Sequence):
+    """
+    Column of repeated values stored as integer codes into a symbol table
+    """
+
+    def __init__(self, values=(), *, symbols=None, lookup=None):
+        self.codes = array("i")
+        self.symbols = [] if symbols is None else symbols
+        self._lookup = {} if lookup is None else lookup
+        for value in values:
+            self.append(value)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        return map(self.symbols.__getitem__, self.codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            column = CategoricalColumn(symbols=self.symbols, lookup=self._lookup)
+            column.codes = self.codes[index]
+            return column
+        return self.symbols[self.codes[index]]
+
+    def __repr__(self):
+        return "CategoricalColumn(%d values, %d symbols)" % (
+            len(self.codes),
+            len(self.symbols),
+        )
+
+    def map(self, func):
+        """
+        Return a new column holding func(value) for every value. func is
+        applied once per symbol, not once per row.
+        """
+        column = CategoricalColumn()
+        recode = [column._encode(func(symbol)) for symbol in self.symbols]
+        column.codes = _recode(self.codes, recode)
+        return column
+
+    def extend(self, values):
+        if isinstance(values, CategoricalColumn):
+            recode = [self._encode(symbol) for symbol in values.symbols]
+            self.codes.extend(_recode(values.codes, recode))
+        else:
+            lookup = self._lookup
+            known = len(lookup)
+            self.codes.extend(
+                [lookup.setdefault(value, len(lookup)) for value in values]
+            )
+            if len(lookup) > known:
+                self.symbols.extend(islice(lookup, known, None))
+
+    def _encode(self, value):
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self.symbols)
+            self.symbols.append(value)
+        return code
+
+    def append(self, value):
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self.symbols)
+            self.symbols.append(value)
+        self.codes.append(code)
+
+
+def _recode(codes, recode):
+    """
+    Translate an array of codes through the list recode
+    """
+    if numpy is not None and codes:
+        codes = numpy.asarray(recode, dtype="i")[numpy.frombuffer(codes, "i")]
+        return array("i", codes.tobytes())
+    return array("i", [recode[code] for code in codes])
+
+
+# array typecodes used to store numeric columns unboxed
+_typecodes = {int: "q", float: "d"}
+
+
+def make_column(func, table=None, encode=True):
+    """
+    Create empty storage for values produced by the converter func. A
+    column with a SymbolTable is encoded with it. Otherwise non-numeric
+    columns are dictionary-encoded only if encode is true.
+    """
+    if table is not None:
+        return CategoricalColumn(symbols=table.symbols, lookup=table.lookup)
+    typecode = _typecodes.get(func)
+    if typecode:
+        return array(typecode)
+    return CategoricalColumn() if encode else []
+
+
+def _make_columns(headers, types, tables):
+    return {
+        name: make_column(
+            func,
+            tables.get(name) if tables is not None else None,
+            encode=tables is None,
+        )
+        for name, func in zip(headers, types)
+    }
+
+
+class GroupBy:
+    """
+    Rows of a DataCollection grouped by key columns. Aggregates are computed
+    over whole columns with NumPy when it is installed and with plain
+    loops otherwise. Groups are ordered by first appearance.
+    """
+
+    aggregates = ("sum", "count", "min", "max", "mean")
+
+    def __init__(self, data, keys):
+        self.data = data
+        self.keys = keys
+        self._groups = None
+
+    def _group_ids(self):
+        """
+        Compute (labels, ids) where ids[n] is the group number of row n
+        and labels[g] is the tuple of key values for group g
+        """
+        if self._groups is not None:
+            return self._groups
+
+        keycodes = []
+        keylabels = []
+        for key in self.keys:
+            codes, labels = _factorize(
+                self.data.column_data[self.data.column_names.index(key)]
+            )
+            keycodes.append(_select(codes, self.data._index))
+            keylabels.append(labels)
+
+        if numpy is not None:
+            combined = numpy.zeros(len(self.data), dtype="q")
+            for codes, labels in zip(keycodes, keylabels):
+                combined = combined * len(labels) + numpy.asarray(codes, dtype="q")
+            uniq, first, ids = numpy.unique(
+                combined, return_index=True, return_inverse=True
+            )
+            order = numpy.argsort(first, kind="stable")
+            rank = numpy.empty_like(order)
+            rank[order] = numpy.arange(len(order))
+            ids = rank[ids.ravel()]
+            groupcodes = [
+                numpy.asarray(codes)[first[order]].tolist() for codes in keycodes
+            ]
+        else:
+            groups = {}
+            ids = array("q")
+            for combo in zip(*keycodes):
+                gid = groups.get(combo)
+                if gid is None:
+                    gid = groups[combo] = len(groups)
+                ids.append(gid)
+            groupcodes = list(zip(*groups))
+
+        labels = list(
+            zip(
+                *[
+                    [symbols[code] for code in codes]
+                    for symbols, codes in zip(keylabels, groupcodes)
+                ]
+            )
+        )
+        self._groups = (labels, ids)
+        return self._groups
+
+    def agg(self, **specs):
+        """
+        Aggregate each group. Each keyword names an output column and gives
+        either an aggregate name applied to the column of the same name,
+        or a (column, aggregate) tuple:
+
+            data.group_by('route').agg(rides='sum', days=('rides', 'count'))
+        """
+        labels, ids = self._group_ids()
+        sorting = None
+        columns = {
+            key: [label[k] for label in labels] for k, key in enumerate(self.keys)
+        }
+        for name, spec in specs.items():
+            source, how = (name, spec) if isinstance(spec, str) else spec
+            if how not in self.aggregates:
+                raise ValueError("Unknown aggregate %s" % how)
+            values = self.data.column_data[self.data.column_names.index(source)]
+            if numpy is not None and isinstance(values, (array, memoryview)):
+                values = numpy.frombuffer(values, _typecode(values))
+                values = _select(values, self.data._index)
+                if sorting is None:
+                    sorting = _sort_groups(ids, len(labels))
+                columns[name] = _aggregate_numpy(sorting, values, how)
+            else:
+                values = _select(values, self.data._index)
+                columns[name] = _aggregate_python(ids, values, how, len(labels))
+        return DataCollection(columns)
+
+
+def _typecode(values):
+    """
+    Return the item typecode of an array or a memoryview cast from one
+    """
+    return values.typecode if isinstance(values, array) else values.format
+
+
+def _factorize(column):
+    """
+    Return (codes, labels) describing the distinct values of a column
+    """
+    if isinstance(column, CategoricalColumn):
+        codes = column.codes
+        if numpy is not None:
+            codes = numpy.frombuffer(codes, "i")
+        return codes, column.symbols
+    encoded = CategoricalColumn(column)
+    return encoded.codes, encoded.symbols
+
+
+def _select(values, index):
+    """
+    Restrict a column to the rows of a view index
+    """
+    if index is None:
+        return values
+    if isinstance(index, range):
+        # A reversed range ends at -1, which a slice would read as "last row"
+        stop = index.stop if index.stop >= 0 else None
+        return values[index.start : stop : index.step]
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return values[numpy.frombuffer(index, "q")]
+    return [values[n] for n in index]
+
+
+def _sort_groups(ids, ngroups):
+    """
+    Return (order, starts, counts) such that values[order] lists the rows
+    group by group and starts gives the offset of each group
+    """
+    counts = numpy.bincount(ids, minlength=ngroups)
+    order = numpy.argsort(ids, kind="stable")
+    starts = numpy.concatenate(([0], numpy.cumsum(counts)[:-1]))
+    return order, starts, counts
+
+
+def _aggregate_numpy(sorting, values, how):
+    order, starts, counts = sorting
+    if len(counts) == 0:
+        return []
+    if how == "count":
+        return counts.tolist()
+    ordered = values[order]
+    if how == "min":
+        result = numpy.minimum.reduceat(ordered, starts)
+    elif how == "max":
+        result = numpy.maximum.reduceat(ordered, starts)
+    else:
+        result = numpy.add.reduceat(ordered, starts)
+        if how == "mean":
+            result = result / counts
+    return result.tolist()
+
+
+def _aggregate_python(ids, values, how, ngroups):
+    counts = [0] * ngroups
+    if how == "count":
+        for gid in ids:
+            counts[gid] += 1
+        return counts
+    if how in ("sum", "mean"):
+        totals = [0] * ngroups
+        for gid, val in zip(ids, values):
+            totals[gid] += val
+            counts[gid] += 1
+        if how == "mean":
+            return [total / count for total, count in zip(totals, counts)]
+        return totals
+    better = min if how == "min" else max
+    result = [None] * ngroups
+    for gid, val in zip(ids, values):
+        current = result[gid]
+        result[gid] = val if current is None else better(current, val)
+    return result
+
+
+class Index:
+    """
+    Base class for indexes over the rows of a DataCollection. Lookups
+    return row positions that can be passed to DataCollection.take().
+    """
+
+    def __init__(self, columns, nrows):
+        self.columns = tuple(columns)
+        self.nrows = nrows
+
+    def check(self, data):
+        """
+        Make sure the index was built for the given collection
+        """
+        if self.nrows != len(data) or not set(self.columns) <= set(data.column_names):
+            raise ValueError("Index does not match the data collection")
+        return self
+
+    def save(self, filename):
+        with open(filename, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, filename, data=None):
+        with open(filename, "rb") as f:
+            index = pickle.load(f)
+        if not isinstance(index, cls):
+            raise TypeError("Expected a %s in %s" % (cls.__name__, filename))
+        if data is not None:
+            index.check(data)
+        return index
+
+
+class HashIndex(Index):
+    """
+    Equality index. Row positions are stored grouped by key in a single
+    array, so each lookup is one dict probe and one slice.
+    """
+
+    def __init__(self, columns, nrows, groups, order, offsets):
+        super().__init__(columns, nrows)
+        self.groups = groups
+        self.order = order
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, data, columns):
+        labels, ids = GroupBy(data, columns)._group_ids()
+        groups = {label: gid for gid, label in enumerate(labels)}
+        if numpy is not None:
+            order, starts, counts = _sort_groups(ids, len(labels))
+            offsets = numpy.append(starts[: len(labels)], len(ids)).astype("q")
+            return cls(
+                columns,
+                len(data),
+                groups,
+                array("q", order.astype("q").tobytes()),
+                array("q", offsets.tobytes()),
+            )
+
+        offsets = array("q", [0] * (len(labels) + 1))
+        for gid in ids:
+            offsets[gid + 1] += 1
+        for n in range(len(labels)):
+            offsets[n + 1] += offsets[n]
+        order = array("q", bytes(8 * len(ids)))
+        fill = offsets[:-1]
+        for position, gid in enumerate(ids):
+            order[fill[gid]] = position
+            fill[gid] += 1
+        return cls(columns, len(data), groups, order, offsets)
+
+    def get(self, *key):
+        """
+        Return the positions of rows whose indexed columns equal key
+        """
+        gid = self.groups.get(key)
+        if gid is None:
+            return array("q")
+        return self.order[self.offsets[gid] : self.offsets[gid + 1]]
+
+    def __contains__(self, key):
+        return (key if isinstance(key, tuple) else (key,)) in self.groups
+
+    def __len__(self):
+        return len(self.groups)
+
+
+class SortedIndex(Index):
+    """
+    Ordered index supporting equality and range lookups by bisection
+    """
+
+    def __init__(self, columns, nrows, keys, order, key=None):
+        super().__init__(columns, nrows)
+        self.keys = keys
+        self.order = order
+        self.key = key
+
+    @classmethod
+    def build(cls, data, columns, key=None):
+        if len(columns) == 1:
+            values = list(data.column(columns[0]))
+        else:
+            values = list(zip(*[data.column(name) for name in columns]))
+
+        # Sort the distinct values once and then order the rows by rank,
+        # so the key function and key comparisons run once per value
+        distinct = {val: val for val in set(values)}
+        if key is not None:
+            distinct = {val: key(val) for val in distinct}
+        ranks = {
+            val: n for n, val in enumerate(sorted(distinct, key=distinct.__getitem__))
+        }
+        codes = [ranks[val] for val in values]
+        order = array("q", sorted(range(len(codes)), key=codes.__getitem__))
+        keys = [distinct[values[n]] for n in order]
+        return cls(columns, len(data), keys, order, key)
+
+    def __getstate__(self):
+        # Key functions are often lambdas which can't be pickled
+        state = dict(self.__dict__)
+        state["key"] = None
+        return state
+
+    @classmethod
+    def load(cls, filename, data=None, key=None):
+        index = super().load(filename, data)
+        index.key = key
+        return index
+
+    def _key(self, value):
+        return value if self.key is None else self.key(value)
+
+    def get(self, *key):
+        """
+        Return the positions of rows whose indexed columns equal key
+        """
+        value = key[0] if len(key) == 1 else key
+        return self.between(value, value)
+
+    def between(self, low=None, high=None):
+        """
+        Return the positions of rows with low <= key <= high. Either end
+        may be None to leave the range open.
+        """
+        start = 0 if low is None else bisect_left(self.keys, self._key(low))
+        stop = (
+            len(self.keys) if high is None else bisect_right(self.keys, self._key(high))
+        )
+        return self.order[start:stop]
 
 
 class Row:
@@ -51,29 +637,282 @@ class RowWithSlots:
 # Row = namedtuple('Row',('route','date','daytype','rides'))
 
 
-def read_csv_as_columns(filename, types):
-    columns = defaultdict(list)
-    with open(filename) as f:
-        rows = csv.reader(f)
+def read_csv_as_columns(
+    filename, types, *, workers=None, cache=False, categorical=None, fast=False
+):
+    """
+    Read CSV data into typed columns. int and float columns are stored
+    in arrays, everything else is dictionary-encoded. If categorical is
+    given, only the columns it names are encoded and the rest are lists.
+    It may be a dict of SymbolTables to collect cardinality stats. If
+    workers is given, chunks of the file are parsed in that many
+    processes, unless the file is compressed. If cache is true, the
+    columns are saved to a binary sidecar file that later calls
+    memory-map instead of parsing the CSV again. The cache is not used
+    with categorical, or if a converter is a lambda, nested function or
+    other callable without a module-level name. If fast is true, rows
+    are split with fast_csv_reader.
+    """
+    tokenizer = fast_csv_reader if fast else csv.reader
+    tables = symbol_tables(categorical)
+    cache = cache and tables is None
+    if cache:
+        data = load_column_cache(filename, types)
+        if data is not None:
+            return data
+
+    if workers and not is_compressed(filename):
+        data = _read_columns_parallel(filename, types, workers, tables, tokenizer)
+    else:
+        data = _read_columns(filename, types, tables, tokenizer)
+
+    if cache:
+        save_column_cache(filename, types, data)
+    return data
+
+
+def _read_columns(filename, types, tables=None, tokenizer=csv.reader):
+    with open_csv(filename) as f:
+        rows = tokenizer(f)
         headers = next(rows)
-        for row in rows:
-            for name, func, val in zip(headers, types, row):
-                columns[name].append(func(val))
+        return DataCollection(_load_columns(rows, headers, types, tables=tables))
+
 
+def _load_columns(rows, headers, types, batchsize=4096, tables=None):
+    """
+    Convert rows into typed columns, a batch of rows at a time so that
+    each column is filled by a single extend() call per batch
+    """
+    columns = _make_columns(headers, types, tables)
+    converters = list(zip(columns.values(), types))
+    counted = _counted_tables(tables, columns)
+    while True:
+        batch = list(islice(rows, batchsize))
+        if not batch:
+            break
+        if min(map(len, batch)) < len(converters):
+            batch = [row for row in batch if row]
+            if batch and min(map(len, batch)) < len(converters):
+                raise ValueError("Expected %d values per row" % len(converters))
+        for n, (column, func) in enumerate(converters):
+            column.extend(map(func, map(itemgetter(n), batch)))
+        for table in counted:
+            table.values += len(batch)
+    return columns
+
+
+def _counted_tables(tables, columns):
+    """
+    Return the tables of categorical columns that are in the file. Names
+    that aren't in the headers are ignored.
+    """
+    if not tables:
+        return []
+    return [table for name, table in tables.items() if name in columns]
+
+
+def _read_column_chunk(filename, start, stop, headers, types, categorical, tokenizer):
+    with open_chunk(filename, start, stop) as f:
+        return _load_columns(
+            tokenizer(f), headers, types, tables=symbol_tables(categorical)
+        )
+
+
+def _read_columns_parallel(filename, types, workers, tables=None, tokenizer=csv.reader):
+    headers, start = read_headers(filename)
+    if not headers:
+        # No header row to share out, so read it like a single process would
+        return _read_columns(filename, types, tables, tokenizer)
+    ranges = chunk_ranges(filename, workers * 4, start)
+    columns = _make_columns(headers, types, tables)
+    counted = _counted_tables(tables, columns)
+    with ProcessPoolExecutor(workers) as pool:
+        results = pool.map(
+            _read_column_chunk,
+            repeat(filename),
+            [lo for lo, hi in ranges],
+            [hi for lo, hi in ranges],
+            repeat(headers),
+            repeat(types),
+            repeat(list(tables) if tables is not None else None),
+            repeat(tokenizer),
+        )
+        for chunk in results:
+            for name, column in columns.items():
+                column.extend(chunk[name])
+            nrows = len(next(iter(chunk.values()), ()))
+            for table in counted:
+                table.values += nrows
     return DataCollection(columns)
 
 
-def read_rides_as_data_collection(filename, converters):
+# Layout of a column cache file: the magic bytes, the length of a JSON
+# header, the header itself and then the raw column buffers, each
+# starting on an 8-byte boundary.
+_CACHE_MAGIC = b"COLCACHE"
+_CACHE_SUFFIX = ".colcache"
+
 
+def _converter_name(func):
+    """
+    Return a stable name for a converter, or None if it has none. Lambdas,
+    nested functions and callable objects can't be told apart by name.
+    """
+    name = getattr(func, "__qualname__", None)
+    if not isinstance(name, str) or "<" in name:
+        return None
+    return f"{func.__module__}.{name}"
+
+
+def _cache_key(filename, types):
+    """
+    Describe the source file and converters a cache file was built from.
+    Returns None if a converter has no stable name to record.
+    """
+    names = [_converter_name(func) for func in types]
+    if None in names:
+        return None
+    st = os.stat(filename)
+    return {
+        "source": os.path.abspath(filename),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "types": names,
+        "byteorder": sys.byteorder,
+    }
+
+
+def _align(offset):
+    return (offset + 7) // 8 * 8
+
+
+def save_column_cache(filename, types, data):
+    """
+    Write the columns of data to the cache file for filename. Returns
+    False if the data can't be cached or the file can't be written.
+    """
+    buffers = []
+    layout = []
+    for name, column in zip(data.column_names, data.column_data):
+        if isinstance(column, CategoricalColumn):
+            if not all(
+                symbol is None or type(symbol) in (str, int, float, bool)
+                for symbol in column.symbols
+            ):
+                return False
+            layout.append({"name": name, "typecode": "i", "symbols": column.symbols})
+            buffers.append(column.codes)
+        elif isinstance(column, array):
+            layout.append({"name": name, "typecode": column.typecode})
+            buffers.append(column)
+        else:
+            return False
+
+    header = _cache_key(filename, types)
+    if header is None:
+        return False
+    header["nrows"] = len(data)
+    header["columns"] = layout
+    offset = 0
+    for entry, buf in zip(layout, buffers):
+        entry["offset"] = offset
+        entry["nbytes"] = len(buf) * buf.itemsize
+        offset = _align(offset + entry["nbytes"])
+    encoded = json.dumps(header).encode("utf-8")
+    start = _align(len(_CACHE_MAGIC) + 8 + len(encoded))
+
+    # Write to a private temporary file so that processes caching the
+    # same file at once don't interleave their output
+    cachename = filename + _CACHE_SUFFIX
+    try:
+        fd, tmpname = tempfile.mkstemp(
+            prefix=os.path.basename(cachename) + ".",
+            dir=os.path.dirname(os.path.abspath(cachename)),
+        )
+    except OSError:
+        return False
+    try:
+        with open(fd, "wb") as f:
+            f.write(_CACHE_MAGIC)
+            f.write(len(encoded).to_bytes(8, "little"))
+            f.write(encoded)
+            for entry, buf in zip(layout, buffers):
+                f.write(bytes(start + entry["offset"] - f.tell()))
+                f.write(buf.tobytes())
+        os.replace(tmpname, cachename)
+    except OSError:
+        os.unlink(tmpname)
+        return False
+    return True
+
+
+def load_column_cache(filename, types):
+    """
+    Memory-map the cache file for filename. Returns None if there is no
+    usable cache file, it is out of date, or types can't be identified. The
+    returned columns are read-only views of the mapped pages, so processes
+    loading the same cache share memory. Appending to the collection copies
+    them first.
+    """
+    key = _cache_key(filename, types)
+    if key is None:
+        return None
+    try:
+        f = open(filename + _CACHE_SUFFIX, "rb")
+    except OSError:
+        return None
+    with f:
+        if f.read(len(_CACHE_MAGIC)) != _CACHE_MAGIC:
+            return None
+        size = int.from_bytes(f.read(8), "little")
+        try:
+            header = json.loads(f.read(size))
+        except ValueError:
+            return None
+        if not isinstance(header, dict) or any(
+            header.get(k) != v for k, v in key.items()
+        ):
+            return None
+        mapped = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    start = _align(len(_CACHE_MAGIC) + 8 + size)
+    columns = {}
+    for entry in header["columns"]:
+        offset = start + entry["offset"]
+        if offset + entry["nbytes"] > len(mapped):
+            return None
+        values = mapped[offset : offset + entry["nbytes"]].cast(entry["typecode"])
+        if "symbols" in entry:
+            symbols = entry["symbols"]
+            lookup = {symbol: code for code, symbol in enumerate(symbols)}
+            column = CategoricalColumn(symbols=symbols, lookup=lookup)
+            column.codes = values
+            values = column
+        columns[entry["name"]] = values
+    return DataCollection(columns)
+
+
+def read_rides_as_data_collection(filename, converters, *, categorical=None):
+    """
+    Read the bus ride data into a DataCollection of lists. Columns
+    named in categorical are dictionary-encoded instead.
+    """
+    tables = symbol_tables(categorical) or {}
     columns = defaultdict(list)
 
-    with open(filename) as f:
+    with open_csv(filename) as f:
         rows = csv.reader(f)
         headers = next(rows)
+        for name in headers:
+            if name in tables:
+                columns[name] = make_column(None, tables[name])
         for row in rows:
             for name, func, val in zip(headers, converters, row):
                 columns[name].append(func(val))
 
+    for name, table in tables.items():
+        if name in columns:
+            table.values += len(columns[name])
     return DataCollection(columns)
 
 
@@ -81,8 +920,8 @@ def read_rides_as_dicts(filename):
     """
     Read the bus ride data as a list of dicts
     """
-    records = DataCollection()
-    with open(filename) as f:
+    records = []
+    with open_csv(filename) as f:
         rows = csv.reader(f)
         headings = next(rows)  # Skip headers
 
@@ -103,7 +942,7 @@ def read_rides_as_instances(filename):
     Read the bus ride data as a list of Class instances
     """
     records = []
-    with open(filename) as f:
+    with open_csv(filename) as f:
         rows = csv.reader(f)
         headings = next(rows)  # Skip headers
 
@@ -123,7 +962,7 @@ def read_rides_as_instances_with_slots(filename):
     Read the bus ride data as a list of Class instances
     """
     records = []
-    with open(filename) as f:
+    with open_csv(filename) as f:
         rows = csv.reader(f)
         headings = next(rows)  # Skip headers
 
@@ -143,7 +982,7 @@ def read_rides_as_tuples(filename):
     Read the bus ride data as a list of tuples
     """
     records = []
-    with open(filename) as f:
+    with open_csv(filename) as f:
         rows = csv.reader(f)
         headings = next(rows)  # Skip headers
 
@@ -167,7 +1006,7 @@ def read_rides_as_named_tuples(filename):
     """
 
     records = []
-    with open(filename) as f:
+    with open_csv(filename) as f:
         rows = csv.reader(f)
         headings = next(rows)  # Skip headers
 
@@ -184,7 +1023,7 @@ def read_rides_as_named_tuples(filename):
 
 
 def read_rides_as_generator(filename):
-    f = open(filename)
+    f = open_csv(filename)
     f_csv = csv.reader(f)
     headers = next(f_csv)
 
@@ -208,7 +1047,7 @@ def read_rides_as_columns(filename):
     dates = []
     daytypes = []
     numrides = []
-    with open(filename) as f:
+    with open_csv(filename) as f:
         rows = csv.reader(f)
         headings = next(rows)  # Skip headers
         for row in rows:
@@ -219,15 +1058,18 @@ def read_rides_as_columns(filename):
     return dict(routes=routes, dates=dates, daytypes=daytypes, numrides=numrides)
 
 
-def read_file_as_type(filename="Data/ctabus.csv", type_name="dict", converters=[]):
+def read_file_as_type(
+    filename="Data/ctabus.csv", type_name="dict", converters=[], **options
+):
     tracemalloc.start()
     tracemalloc.clear_traces()
 
     results = None
 
     try:
-
-        results = globals()[f"read_rides_as_{type_name}"](filename, converters)
+        results = globals()[f"read_rides_as_{type_name}"](
+            filename, converters, **options
+        )
 
         current, peak = tracemalloc.get_traced_memory()
 
@@ -242,7 +1084,6 @@ def read_file_as_type(filename="Data/ctabus.csv", type_name="dict", converters=[
 
 
 if __name__ == "__main__":
-
     # for type_name in ["tuple", "named_tuple", "dict", "instance", "slots"]:
     for function_to_call in [
         read_rides_as_tuples,
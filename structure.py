@@ -1,4 +1,4 @@
-from validate import Validator, validated
+from validate import Validator, ColumnError, validated, check_code, validation
 from collections import ChainMap
 
 
@@ -10,12 +10,42 @@ class StructureMeta(type):
     @staticmethod
     def __new__(meta, name, bases, methods):
         methods = methods.maps[0]
+        if methods.get("_compact"):
+            # Store fields in __slots__. The validators move out of the
+            # class namespace (a slot can't share its name with a class
+            # attribute) and are applied by __setattr__ instead.
+            validators = {
+                key: val for key, val in methods.items() if isinstance(val, Validator)
+            }
+            for key, val in validators.items():
+                val.name = key
+                del methods[key]
+            methods["__slots__"] = tuple(validators)
+            methods["_validators"] = validators
+            methods.setdefault("__setattr__", _set_field)
         return super().__new__(meta, name, bases, methods)
 
 
+def _set_field(self, name, value):
+    """
+    __setattr__ for compact structures. Every attribute is a field, so
+    looking up the validator also rejects unknown names.
+    """
+    try:
+        validator = self._validators[name]
+    except KeyError:
+        raise AttributeError("No attribute %s" % name) from None
+    if validation.should_check():
+        value = validator.fast_check(value)
+    object.__setattr__(self, name, value)
+
+
 class Structure(metaclass=StructureMeta):
+    __slots__ = ()
     _fields = ()
     _types = ()
+    # Set _compact = True in a subclass to store fields in __slots__
+    _compact = False
 
     def __iter__(self):
         for name in self._fields:
@@ -46,19 +76,72 @@ class Structure(metaclass=StructureMeta):
     def __init_subclass__(cls):
         validate_attributes(cls)
 
+    @classmethod
+    def validate_columns(cls, data):
+        """
+        Check the columns of a DataCollection against the field validators,
+        raising a single ColumnError that lists every bad value
+        """
+        errors = []
+        for name in cls._fields:
+            try:
+                cls._validators[name].check_column(data.column(name), name)
+            except ColumnError as e:
+                errors.extend(e.errors)
+        if errors:
+            raise ColumnError(sorted(errors, key=lambda err: err[0]))
+        return data
+
     @classmethod
     def create_init(cls):
         """
-        Create an __init__ method from _fields
+        Create an __init__ method from _fields. The validator checks for
+        each field are inlined and the values stored directly.
         """
         args = ",".join(cls._fields)
         code = "def __init__(self, {0}):\n".format(args)
-        statements = ["    self.{0} = {0}".format(name) for name in cls._fields]
-        code += "\n".join(statements)
-        locs = {}
+        locs = {"_should_check": validation.should_check}
+        checks = ["    if _should_check():"]
+        stores = [] if cls._compact else ["    _d = self.__dict__"]
+        for n, name in enumerate(cls._fields):
+            validator = cls._validators[name]
+            locs[f"_V{n}"] = type(validator)
+            checks.extend(
+                "        " + line for line in check_code(validator, name, f"_V{n}")
+            )
+            if type(validator).__set__ is not Validator.__set__:
+                stores.append("    self.{0} = {0}".format(name))
+            elif cls._compact:
+                locs[f"_set{n}"] = vars(cls)[name].__set__
+                stores.append("    _set{0}(self, {1})".format(n, name))
+            else:
+                stores.append("    _d[{0!r}] = {0}".format(name))
+        if len(checks) == 1:
+            checks.append("        pass")
+        code += "\n".join(checks + stores)
         exec(code, locs)
         cls.__init__ = locs["__init__"]
 
+    @classmethod
+    def create_from_row(cls):
+        """
+        Create a from_row() classmethod with the conversions from _types
+        unrolled into a single expression. Short rows take the generic
+        path so that cls() reports the missing arguments.
+        """
+        ncols = len(cls._types)
+        args = ", ".join(f"_t{n}(row[{n}])" for n in range(ncols))
+        code = (
+            "def from_row(cls, row):\n"
+            f"    if len(row) < {ncols}:\n"
+            "        return cls(*[func(val) for func, val in zip(_types, row)])\n"
+            f"    return cls({args})\n"
+        )
+        locs = {f"_t{n}": func for n, func in enumerate(cls._types)}
+        locs["_types"] = cls._types
+        exec(code, locs)
+        cls.from_row = classmethod(locs["from_row"])
+
     @classmethod
     def from_row(cls, row):
         rowdata = [func(val) for func, val in zip(cls._types, row)]
@@ -78,16 +161,21 @@ def validate_attributes(cls):
         elif callable(val) and val.__annotations__:
             setattr(cls, name, validated(val))
 
+    # Compact structures keep their validators out of the class namespace
+    validators.extend(vars(cls).get("_validators", {}).values())
+
     # Collect all the field names
     cls._fields = tuple([v.name for v in validators])
+    cls._validators = {v.name: v for v in validators}
 
     # Collect type conversions. The lambda x:x is an identity
     # function that's used in case no expected_type is found.
     cls._types = tuple([getattr(v, "expected_type", lambda x: x) for v in validators])
 
-    # Create the __init__ method
+    # Create the __init__ and from_row methods
     if cls._fields:
         cls.create_init()
+        cls.create_from_row()
 
     return cls
 
@@ -1,11 +1,64 @@
-from pprint import pprint
-from colored import Fore, Back, Style
+import os
+import sys
+from itertools import chain
+from operator import attrgetter, itemgetter
 from abc import ABC, abstractmethod
 
 
+class _LazyStyles:
+    """
+    Stands in for one of colored's Fore, Back or Style objects and only
+    imports colored when a colour is first looked up
+    """
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        import colored
+
+        return getattr(getattr(colored, self._name), attr)
+
+
+class _PlainStyles:
+    """
+    Used instead of Fore, Back and Style when colour is off
+    """
+
+    def __getattr__(self, attr):
+        return ""
+
+
+Fore = _LazyStyles("Fore")
+Back = _LazyStyles("Back")
+Style = _LazyStyles("Style")
+_plain = _PlainStyles()
+
+
+def use_color(out=None):
+    """
+    Decide whether to colour output written to out (sys.stdout by
+    default). Only terminals get colour, and never if NO_COLOR is set.
+    """
+    if os.environ.get("NO_COLOR"):
+        return False
+    isatty = getattr(out or sys.stdout, "isatty", None)
+    return bool(isatty and isatty())
+
+
+def _styles(color):
+    return (Fore, Back, Style) if color else (_plain, _plain, _plain)
+
+
 class ColumnFormatMixin:
     formats = []
 
+    def cell_code(self, n, locs):
+        if n >= len(self.formats):
+            return None
+        locs[f"_f{n}"] = self.formats[n]
+        return f"(_f{n} % rowdata[{n}])"
+
     def row(self, rowdata):
         rowdata = [(fmt % d) for fmt, d in zip(self.formats, rowdata)]
         super().row(rowdata)
@@ -17,10 +70,25 @@ class UpperHeadersMixin:
 
 
 class TableFormatter(ABC):
-    def __init__(self):
+    """
+    Base class for table formatters. Output is streamed: headings() and
+    row() render their lines immediately and print() finishes the table.
+    Lines are collected in a buffer and written to out (sys.stdout by
+    default) once flush_size characters are waiting, so large tables take
+    a few big writes instead of a print() per row. A flush_size of 0
+    writes every line straight away. color turns the terminal colours
+    on or off and by default follows use_color(out).
+    """
+
+    def __init__(self, out=None, flush_size=1 << 16, color=None):
         self._width = 0
         self._columns = 0
-        self._list_to_print = list()
+        self.color = use_color(out) if color is None else color
+        self.fore, self.back, self.style = _styles(self.color)
+        self.out = out
+        self.flush_size = flush_size
+        self._buffer = []
+        self._buffered = 0
 
     @property
     def width(self):
@@ -34,24 +102,112 @@ class TableFormatter(ABC):
     def row(self, rowdata):
         raise NotImplementedError()
 
-    @staticmethod
-    def print_line(line=""):
-        print(line)
+    def write(self, text):
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.flush_size:
+            self.flush()
+
+    def write_line(self, line=""):
+        self.write(line + "\n")
+
+    def flush(self):
+        if self._buffer:
+            (self.out or sys.stdout).write("".join(self._buffer))
+            self._buffer.clear()
+            self._buffered = 0
+
+    def print_line(self, line=""):
+        self.write_line(line)
 
     def print(self):
-        for line in self._list_to_print:
-            self.print_line(line)
+        self.flush()
+
+    # Set to False to render rows through the row() methods
+    compile_rows = True
+
+    def cell_code(self, n, locs):
+        """
+        Source for the value of cell n of rowdata, or None to drop it
+        """
+        return f"rowdata[{n}]"
+
+    def row_code(self, cells, locs):
+        """
+        Source for an expression rendering a whole row, with a trailing
+        newline, from the cell sources. None if rows can't be compiled.
+        """
+        return None
+
+    def _row_compilable(self):
+        # A row() override without the code hooks must be kept
+        for cls in type(self).__mro__:
+            if "row" in vars(cls):
+                return "row_code" in vars(cls) or "cell_code" in vars(cls)
+        return False
+
+    def compile_row(self, ncols):
+        """
+        Replace row() with a function generated for this table, which
+        renders each row with a single f-string and one buffered write
+        """
+        if not self.compile_rows or not self._row_compilable():
+            return
+        locs = {"_write": self.write}
+        cells = [self.cell_code(n, locs) for n in range(ncols)]
+        expr = self.row_code([cell for cell in cells if cell is not None], locs)
+        if expr is None:
+            return
+        code = f"def row(rowdata):\n    _write({expr})\n"
+        exec(code, locs)
+        self.row = locs["row"]
 
     def divider(self, separator="-", color="yellow"):
         return (
-            getattr(Fore, color)
-            + Style.bold
+            getattr(self.fore, color)
+            + self.style.bold
             + "|".join(f"{separator * self._width}" for _ in range(self._columns))
-            + Style.reset
+            + self.style.reset
         )
 
     def add_divider(self):
-        self._list_to_print.append(self.divider())
+        self.print_line(self.divider())
+
+
+def _row_getter(first, fields):
+    """
+    Pick the fastest way to pull fields out of records shaped like first
+    """
+    if isinstance(first, dict):
+        getter = itemgetter(*fields)
+    elif isinstance(first, tuple) and hasattr(first, "_fields"):
+        getter = itemgetter(*[first._fields.index(name) for name in fields])
+    elif isinstance(first, (tuple, list)):
+        # Plain sequences are taken to hold the fields in order already
+        return None
+    else:
+        getter = attrgetter(*fields)
+    if len(fields) == 1:
+        return lambda record: (getter(record),)
+    return getter
+
+
+def table_rows(records, fields):
+    """
+    Return an iterator over the field values of each record. The record
+    kind is checked once, from the first record. Columnar collections
+    such as readrides.DataCollection are read column by column without
+    building a dict per row.
+    """
+    if hasattr(records, "column") and hasattr(records, "column_names"):
+        return zip(*[records.column(name) for name in fields])
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        return iter(())
+    records = chain([first], records)
+    getter = _row_getter(first, fields)
+    return records if getter is None else map(getter, records)
 
 
 def print_table(records, fields, formatter):
@@ -62,12 +218,9 @@ def print_table(records, fields, formatter):
 
     formatter.headings(fields)
 
-    for r in records:
-        rowdata = [
-            r[fieldname] if type(r) == dict else getattr(r, fieldname)
-            for fieldname in fields
-        ]
-        formatter.row(rowdata)
+    row = formatter.row
+    for rowdata in table_rows(records, fields):
+        row(rowdata)
 
     formatter.print()
 
@@ -78,36 +231,39 @@ class TextTableFormatter(TableFormatter):
         self._width = max(self._width, *[(len(h) + 9) // 10 * 10 for h in headers])
 
         self.add_divider()
-
-        self._list_to_print.append(
-            Fore.white
-            + Back.deep_sky_blue_3a
+        self.print_line(
+            self.fore.white
+            + self.back.deep_sky_blue_3a
             + "x".join(f"{header:^{self._width}s}" for header in headers)
-            + Style.reset
+            + self.style.reset
         )
         self.add_divider()
-
-        for line in self._list_to_print:
-            self.print_line(line)
+        self.compile_row(len(headers))
 
     def row(self, rowdata):
         self.print_line(
-            f"{Fore.yellow}|{Style.reset}".join(
+            f"{self.fore.yellow}|{self.style.reset}".join(
                 f"{cell:^{self._width}}" for cell in rowdata
             )
         )
 
-    @staticmethod
-    def print_line(line=""):
-        print(
-            f"{Fore.yellow + Style.bold}|{Style.reset}{line}{Fore.yellow + Style.bold}|{Style.reset}"
-        )
+    def row_code(self, cells, locs):
+        locs["_edge"] = self._edge()
+        locs["_sep"] = f"{self.fore.yellow}|{self.style.reset}"
+        items = "{_sep}".join(f"{{{cell}:^{self._width}}}" for cell in cells)
+        return f'f"{{_edge}}{items}{{_edge}}\\n"'
+
+    def _edge(self):
+        # Border drawn at both ends of every line
+        return f"{self.fore.yellow + self.style.bold}|{self.style.reset}"
+
+    def print_line(self, line=""):
+        edge = self._edge()
+        self.write_line(f"{edge}{line}{edge}")
 
     def print(self):
         self.add_divider()
-        pprint(self._list_to_print)
-        for line in self._list_to_print:
-            self.print_line(line)
+        self.flush()
 
 
 class CSVTableFormatter(TableFormatter):
@@ -115,68 +271,105 @@ class CSVTableFormatter(TableFormatter):
         width = max(self._width, *[(len(h) + 9) // 10 * 10 for h in headers])
         self._width = width
 
-        self._list_to_print.append(",".join(header for header in headers))
-        self._list_to_print.append("")
+        self.print_line(",".join(header for header in headers))
+        self.print_line()
+        self.compile_row(len(headers))
 
     def row(self, rowdata):
-        self._list_to_print.append(f"{','.join(f'{cell}' for cell in rowdata)}")
+        self.print_line(",".join(f"{cell}" for cell in rowdata))
 
+    def row_code(self, cells, locs):
+        items = ",".join(f"{{{cell}}}" for cell in cells)
+        return f'f"{items}\\n"'
 
-def html_tag(tag, content, color="yellow", indent=0, new_line=True):
-    tag_style = getattr(Fore, color) + Style.bold
 
+def html_open(tag, color="yellow", indent=0, new_line=True, plain=False):
+    fore, _, style = _styles(not plain)
+    tag_style = getattr(fore, color) + style.bold
     whitespace = "\n" if new_line else ""
+    indent_string = "\t" * indent if new_line else ""
+    return f"{whitespace}{indent_string}{tag_style}<{tag}>{style.reset}"
 
+
+def html_close(tag, color="yellow", indent=0, new_line=True, plain=False):
+    fore, _, style = _styles(not plain)
+    tag_style = getattr(fore, color) + style.bold
+    whitespace = "\n" if new_line else ""
     indent_string = "\t" * indent if new_line else ""
+    return f"{tag_style}{whitespace}{indent_string}</{tag}>{style.reset}"
 
-    tag_open = f"{whitespace}{indent_string}{tag_style}<{tag}>{Style.reset}"
-    tag_close = f"{tag_style}{whitespace}{indent_string}</{tag}>{Style.reset}"
+
+def html_tag(tag, content, color="yellow", indent=0, new_line=True, plain=False):
+    tag_open = html_open(tag, color, indent, new_line, plain)
+    tag_close = html_close(tag, color, indent, new_line, plain)
     return f"{tag_open}{content}{tag_close}"
 
 
-def tr(content):
-    return html_tag(tag="tr", content=content, indent=1)
+def tr(content, plain=False):
+    return html_tag(tag="tr", content=content, indent=1, plain=plain)
 
 
 class HTMLTableFormatter(TableFormatter):
     def headings(self, headers):
-        self._list_to_print.append(
+        plain = not self.color
+        self.write(html_open("table", plain=plain) + html_open("thead", plain=plain))
+        self.write(
             tr(
                 content="\n\t\t"
                 + "".join(
                     html_tag(
                         tag="th",
-                        content=f"{Style.bold} {header} {Style.reset}",
+                        content=f"{self.style.bold} {header} {self.style.reset}",
                         color="green",
                         new_line=False,
+                        plain=plain,
                     )
                     for header in headers
                 ),
+                plain=plain,
             )
         )
+        self.write(html_close("thead", plain=plain) + html_open("tbody", plain=plain))
+        self.compile_row(len(headers))
 
     def row(self, rowdata):
-        self._list_to_print.append(
+        plain = not self.color
+        self.write(
             tr(
                 "\n\t\t"
                 + "".join(
-                    html_tag(tag="td", content=cell, new_line=False) for cell in rowdata
-                )
+                    html_tag(tag="td", content=cell, new_line=False, plain=plain)
+                    for cell in rowdata
+                ),
+                plain=plain,
             )
         )
 
-    def print(self):
-        table_header = html_tag(tag="thead", content=self._list_to_print[0], indent=0)
+    def row_code(self, cells, locs):
+        plain = not self.color
+        locs["_tr"] = html_open("tr", indent=1, plain=plain) + "\n\t\t"
+        locs["_tr_end"] = html_close("tr", indent=1, plain=plain)
+        locs["_td"] = html_open("td", new_line=False, plain=plain)
+        locs["_td_end"] = html_close("td", new_line=False, plain=plain)
+        items = "".join(f"{{_td}}{{{cell}}}{{_td_end}}" for cell in cells)
+        return f'f"{{_tr}}{items}{{_tr_end}}"'
 
-        table_body = html_tag(
-            tag="tbody",
-            indent=0,
-            content=f'{"".join(self._list_to_print[1:])}',
+    def print(self):
+        plain = not self.color
+        self.write_line(
+            html_close("tbody", plain=plain) + html_close("table", plain=plain)
         )
-        print(html_tag(tag="table", content=f"{table_header}{table_body}", indent=0))
+        self.flush()
 
 
-def create_formatter(name, column_formats=None, upper_headers=False):
+def create_formatter(
+    name,
+    column_formats=None,
+    upper_headers=False,
+    out=None,
+    flush_size=1 << 16,
+    color=None,
+):
     if name == "text":
         formatter_cls = TextTableFormatter
     elif name == "csv":
@@ -196,9 +389,13 @@ def create_formatter(name, column_formats=None, upper_headers=False):
         class formatter_cls(UpperHeadersMixin, formatter_cls):
             pass
 
-    print(
-        f"\n{Fore.white}{Style.bold}{Back.dark_sea_green_4b}"
-        + f"\t\t{formatter_cls.__name__}\t\t"
-        + Style.reset
-    )
-    return formatter_cls()
+    formatter = formatter_cls(out=out, flush_size=flush_size, color=color)
+    if out is None:
+        # The banner is for the terminal only, never part of the data
+        fore, back, style = _styles(formatter.color)
+        print(
+            f"\n{fore.white}{style.bold}{back.dark_sea_green_4b}"
+            + f"\t\t{formatter_cls.__name__}\t\t"
+            + style.reset
+        )
+    return formatter
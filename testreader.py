@@ -0,0 +1,161 @@
+import csv
+import io
+import os
+import tempfile
+import unittest
+import reader
+from stock import Stock
+
+
+class TestReader(unittest.TestCase):
+    def test_read_csv_as_dicts(self):
+        port = reader.read_csv_as_dicts("Data/portfolio.csv", [str, int, float])
+        self.assertEqual(len(port), 7)
+        self.assertEqual(port[0], {"name": "AA", "shares": 100, "price": 32.2})
+
+    def test_compressed(self):
+        types = [str, int, float]
+        port = reader.read_csv_as_dicts("Data/portfolio.csv", types)
+        self.assertEqual(reader.read_csv_as_dicts("Data/portfolio.csv.gz", types), port)
+        self.assertEqual(
+            reader.read_csv_as_dicts("Data/portfolio.csv.gz", types, workers=2), port
+        )
+
+    def test_fast_csv_reader(self):
+        for filename, delimiter in [
+            ("Data/portfolio.dat", " "),
+            ("Data/missing.csv", ","),
+        ]:
+            with open(filename, newline="") as f:
+                expected = list(csv.reader(f, delimiter=delimiter))
+            with open(filename, newline="") as f:
+                rows = reader.fast_csv_reader(f, delimiter, blocksize=50)
+                self.assertEqual(list(rows), expected)
+        for text in [
+            'a,b\n1,2\n\n"x,\ny",3\n4,5',
+            'a,b\r\n"x\r\ny",3\r\n',
+            "a,b\r1,2\r3,4\r",
+            "a,b\r\n1,2\r\n3,4\r5,6",
+        ]:
+            rows = reader.fast_csv_reader(io.StringIO(text, newline=""), blocksize=4)
+            expected = list(csv.reader(io.StringIO(text, newline="")))
+            self.assertEqual(list(rows), expected)
+
+    def test_iter_matches_list(self):
+        types = [str, int, float]
+        port = reader.read_csv_as_dicts("Data/portfolio.csv", types)
+        stream = reader.iter_read_csv_as_dicts("Data/portfolio.csv", types)
+        self.assertFalse(isinstance(stream, list))
+        self.assertEqual(list(stream), port)
+
+    def test_iter_instances(self):
+        stream = reader.iter_read_csv_as_instances("Data/portfolio.csv", Stock)
+        self.assertEqual(next(stream), Stock("AA", 100, 32.2))
+        stream.close()
+
+    def test_dict_converter_cached(self):
+        convert = reader.make_dict_converter(["a", "b"], [int, float])
+        self.assertIs(convert, reader.make_dict_converter(("a", "b"), (int, float)))
+        self.assertEqual(convert(["1", "2.5"]), {"a": 1, "b": 2.5})
+        self.assertEqual(convert(["1"]), {"a": 1})
+        for n in range(200):
+            reader.make_dict_converter(["a"], [lambda s: s])
+        info = reader._cached_dict_converter.cache_info()
+        self.assertLessEqual(info.currsize, info.maxsize)
+
+        class Scaled:
+            __hash__ = None
+
+            def __call__(self, value):
+                return float(value) * 2
+
+        convert = reader.make_dict_converter(["a"], [Scaled()])
+        self.assertEqual(convert(["1.5"]), {"a": 3.0})
+
+    def test_infer_types(self):
+        headers, types = reader.infer_csv_types("Data/portfolio.csv")
+        self.assertEqual(headers, ["name", "shares", "price"])
+        self.assertEqual(types[1:], [int, float])
+        port = reader.read_csv_as_dicts("Data/portfolio.csv")
+        self.assertEqual(port[0], {"name": "AA", "shares": 100, "price": 32.2})
+
+    def test_optional_converter(self):
+        rows = [["a", "1"], ["a", ""], ["b", "3"], ["a", "4"]]
+        types = reader.infer_types(rows)
+        self.assertEqual(types, [reader.symbol, reader.optional(int)])
+        convert = reader.make_dict_converter(["k", "v"], types)
+        self.assertEqual(convert(["a", ""]), {"k": "a", "v": None})
+        self.assertEqual(convert(["a", "2"]), {"k": "a", "v": 2})
+        self.assertEqual(reader.unquote('"IBM"'), "IBM")
+
+    def test_categorical_interned(self):
+        tables = {"name": reader.SymbolTable()}
+        port = reader.read_csv_as_dicts(
+            "Data/portfolio.csv", [str, int, float], categorical=tables
+        )
+        self.assertIs(port[1]["name"], port[6]["name"])
+        self.assertEqual(tables["name"].stats()["symbols"], 5)
+        self.assertEqual(tables["name"].values, 7)
+
+    def test_parallel_categorical_shared(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "port.csv")
+            with open(filename, "w") as f:
+                f.write("name,shares,price\n")
+                for n in range(300):
+                    f.write("%s,%d,1.5\n" % (["AA", "IBM", "CAT"][n % 3], n))
+            tables = {"name": reader.SymbolTable()}
+            port = reader.read_csv_as_dicts(
+                filename, [str, int, float], workers=2, categorical=tables
+            )
+            stocks = reader.read_csv_as_instances(
+                filename, Stock, workers=2, categorical=["name"]
+            )
+        self.assertEqual(len({id(row["name"]) for row in port}), 3)
+        self.assertEqual(tables["name"].values, 300)
+        self.assertEqual(len({id(s.name) for s in stocks}), 3)
+
+    def test_parallel_matches_serial(self):
+        types = [str, int, float]
+        serial = reader.read_csv_as_dicts("Data/missing.csv", types)
+        with self.assertLogs("reader", level="WARNING") as cm:
+            parallel = reader.read_csv_as_dicts("Data/missing.csv", types, workers=2)
+        self.assertEqual(parallel, serial)
+        self.assertEqual(
+            cm.output[0], "WARNING:reader:Row 4: Bad row: ['C', '', '53.08']"
+        )
+
+    def test_bad_rows_skipped(self):
+        with self.assertLogs("reader", level="WARNING") as cm:
+            port = reader.read_csv_as_dicts("Data/missing.csv", [str, int, float])
+        self.assertEqual(len(port), 20)
+        self.assertEqual(len(cm.output), 8)
+
+    def test_quarantine_sink(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "bad.csv")
+            with reader.QuarantineSink(filename, batch_size=3) as sink:
+                port = reader.read_csv_as_dicts(
+                    "Data/missing.csv", [str, int, float], bad_rows=sink
+                )
+            self.assertEqual(len(port), 20)
+            self.assertEqual(sink.count, 8)
+            with open(filename) as f:
+                rows = list(csv.reader(f))
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(rows[0][0], "4")
+        self.assertEqual(rows[0][2:], ["C", "", "53.08"])
+
+    def test_sampling_sink(self):
+        sink = reader.SamplingSink(limit=2)
+        with self.assertLogs("reader", level="WARNING") as cm:
+            reader.read_csv_as_dicts(
+                "Data/missing.csv", [str, int, float], bad_rows=sink
+            )
+        self.assertEqual(sink.count, 8)
+        self.assertEqual(len(cm.output), 3)
+        self.assertIn("6 more", cm.output[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,220 @@
+import functools
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from array import array
+import readrides
+from reader import SymbolTable
+from readrides import DataCollection, CategoricalColumn
+
+
+class TestDataCollection(unittest.TestCase):
+    def setUp(self):
+        self.data = DataCollection(
+            {
+                "route": CategoricalColumn(["22", "22", "8", "9", "8"]),
+                "date": CategoricalColumn(
+                    ["01/01/2001", "01/02/2001"] * 2 + ["01/01/2011"]
+                ),
+                "rides": array("q", [10, 20, 30, 40, 50]),
+            }
+        )
+
+    def test_len_and_rows(self):
+        self.assertEqual(len(self.data), 5)
+        self.assertEqual(
+            self.data[2], {"route": "8", "date": "01/01/2001", "rides": 30}
+        )
+        self.assertEqual(self.data[-1]["rides"], 50)
+        with self.assertRaises(IndexError):
+            self.data[5]
+        self.assertEqual(list(DataCollection({})), [])
+
+    def test_slice_is_view(self):
+        view = self.data[1:4]
+        self.assertEqual(len(view), 3)
+        self.assertIs(view.column_data[2], self.data.column_data[2])
+        self.assertEqual([row["rides"] for row in view], [20, 30, 40])
+        self.assertEqual(view[::2][1]["route"], "9")
+
+    def test_mask_and_take(self):
+        mask = [d.endswith("2001") for d in self.data.column("date")]
+        view = self.data[mask]
+        self.assertEqual(list(view.column("rides")), [10, 20, 30, 40])
+        self.assertEqual(list(view[[3, 0]].column("route")), ["9", "22"])
+        with self.assertRaises(IndexError):
+            self.data[[True, False]]
+
+    def test_group_by(self):
+        totals = self.data.group_by("route").agg(rides="sum", days=("rides", "count"))
+        self.assertEqual(list(totals.column("route")), ["22", "8", "9"])
+        self.assertEqual(list(totals.column("rides")), [30, 80, 40])
+        self.assertEqual(list(totals.column("days")), [2, 2, 1])
+
+        backwards = self.data[::-1].group_by("route").agg(rides="sum")
+        self.assertEqual(list(backwards.column("route")), ["8", "9", "22"])
+        self.assertEqual(list(backwards.column("rides")), [80, 40, 30])
+        index = self.data[::-1].create_index("route")
+        self.assertEqual(list(index.get("22")), [3, 4])
+
+        years = self.data.with_column("year", "date", lambda d: d[-4:])
+        peaks = years[1:].group_by("year", "route").agg(rides="max")
+        self.assertEqual(
+            list(peaks),
+            [
+                {"year": "2001", "route": "22", "rides": 20},
+                {"year": "2001", "route": "8", "rides": 30},
+                {"year": "2001", "route": "9", "rides": 40},
+                {"year": "2011", "route": "8", "rides": 50},
+            ],
+        )
+
+    def test_indexes(self):
+        index = self.data.create_index("route", "date")
+        self.assertEqual(list(index.get("8", "01/01/2001")), [2])
+        self.assertEqual(list(index.get("8", "01/01/1999")), [])
+
+        by_date = self.data.create_index(
+            "date", kind="sorted", key=lambda d: (d[6:], d[:2], d[3:5])
+        )
+        rows = self.data.take(by_date.between("01/02/2001", "12/31/2011"))
+        self.assertEqual(list(rows.column("rides")), [20, 40, 50])
+        self.assertEqual(len(by_date.get("01/01/2001")), 2)
+
+    def test_index_save_load(self):
+        datekey = lambda d: (d[6:], d[:2], d[3:5])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            hashfile = os.path.join(tmpdir, "route.idx")
+            self.data.create_index("route").save(hashfile)
+            index = readrides.HashIndex.load(hashfile, self.data)
+            self.assertEqual(list(index.get("8")), [2, 4])
+
+            sortfile = os.path.join(tmpdir, "date.idx")
+            self.data.create_index("date", kind="sorted", key=datekey).save(sortfile)
+            by_date = readrides.SortedIndex.load(sortfile, self.data, key=datekey)
+            self.assertIs(by_date.key, datekey)
+            self.assertEqual(
+                list(by_date.between("01/02/2001", "12/31/2011")), [1, 3, 4]
+            )
+
+            with self.assertRaisesRegex(ValueError, "does not match"):
+                readrides.HashIndex.load(hashfile, self.data[:3])
+            with self.assertRaises(TypeError):
+                readrides.SortedIndex.load(hashfile)
+
+    def test_append(self):
+        self.data.append({"route": "22", "date": "01/03/2011", "rides": 5})
+        self.assertEqual(len(self.data), 6)
+        with self.assertRaises(TypeError):
+            self.data[:2].append(self.data[0])
+
+
+class TestCategorical(unittest.TestCase):
+    def test_categorical_columns(self):
+        tables = {"name": SymbolTable()}
+        data = readrides.read_csv_as_columns(
+            "Data/portfolio.csv", [str, int, float], categorical=tables
+        )
+        self.assertIsInstance(data.column_data[0], CategoricalColumn)
+        self.assertIs(data.column_data[0].symbols, tables["name"].symbols)
+        self.assertEqual(tables["name"].stats()["symbols"], 5)
+        self.assertEqual(tables["name"].values, 7)
+        self.assertEqual(data[0], {"name": "AA", "shares": 100, "price": 32.2})
+
+    def test_unknown_categorical_ignored(self):
+        types = [str, int, float]
+        for read in (
+            readrides.read_csv_as_columns,
+            readrides.read_rides_as_data_collection,
+        ):
+            tables = {"name": SymbolTable(), "nosuch": SymbolTable()}
+            data = read("Data/portfolio.csv", types, categorical=tables)
+            self.assertEqual(data.column_names, ["name", "shares", "price"])
+            self.assertEqual(len(list(data)), 7)
+            self.assertEqual(tables["name"].values, 7)
+            self.assertEqual(tables["nosuch"].values, 0)
+
+    def test_only_named_columns_encoded(self):
+        data = readrides.read_csv_as_columns(
+            "Data/portfolio.csv", [str, str, float], categorical=["shares"]
+        )
+        self.assertIsInstance(data.column_data[0], list)
+        self.assertIsInstance(data.column_data[1], CategoricalColumn)
+
+
+class TestReadColumns(unittest.TestCase):
+    def test_column_storage(self):
+        data = readrides.read_csv_as_columns("Data/portfolio.csv", [str, int, float])
+        name, shares, price = data.column_data
+        self.assertIsInstance(name, CategoricalColumn)
+        self.assertIsInstance(shares, array)
+        self.assertEqual(shares.typecode, "q")
+        self.assertIsInstance(price, array)
+        self.assertEqual(price.typecode, "d")
+        self.assertEqual(data[0], {"name": "AA", "shares": 100, "price": 32.2})
+
+    def test_no_header_row(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "empty.csv")
+            open(filename, "w").close()
+            for workers in (None, 3):
+                with self.assertRaises(StopIteration):
+                    readrides.read_csv_as_columns(filename, [str], workers=workers)
+
+
+class TestColumnCache(unittest.TestCase):
+    def test_cache_roundtrip(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = shutil.copy("Data/portfolio.csv", tmpdir)
+            types = [str, int, float]
+            parsed = readrides.read_csv_as_columns(filename, types, cache=True)
+            self.assertTrue(os.path.exists(filename + ".colcache"))
+            cached = readrides.load_column_cache(filename, types)
+            self.assertIsInstance(cached.column_data[1], memoryview)
+            self.assertEqual(list(cached), list(parsed))
+            self.assertIsNone(readrides.load_column_cache(filename, [str, str, float]))
+
+            cached.append({"name": "XYZ", "shares": 7, "price": 1.5})
+            self.assertEqual(cached[-1], {"name": "XYZ", "shares": 7, "price": 1.5})
+            self.assertEqual(len(cached), len(parsed) + 1)
+
+    def test_cache_write_errors(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = shutil.copy("Data/portfolio.csv", tmpdir)
+            types = [str, int, float]
+            with mock.patch("os.replace", side_effect=PermissionError):
+                data = readrides.read_csv_as_columns(filename, types, cache=True)
+            self.assertEqual(len(data), 7)
+            self.assertEqual(os.listdir(tmpdir), ["portfolio.csv"])
+
+    def test_corrupt_cache_ignored(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = shutil.copy("Data/portfolio.csv", tmpdir)
+            types = [str, int, float]
+            readrides.read_csv_as_columns(filename, types, cache=True)
+            with open(filename + ".colcache", "r+b") as f:
+                f.seek(16)
+                f.write(b"}{")
+            self.assertIsNone(readrides.load_column_cache(filename, types))
+
+    def test_unnamed_converters_not_cached(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = shutil.copy("Data/portfolio.csv", tmpdir)
+            half = [str, int, lambda s: float(s) / 2]
+            readrides.read_csv_as_columns(filename, half, cache=True)
+            self.assertFalse(os.path.exists(filename + ".colcache"))
+            double = [str, int, lambda s: float(s) * 2]
+            data = readrides.read_csv_as_columns(filename, double, cache=True)
+            self.assertEqual(data[0]["price"], 64.4)
+            shares = functools.partial(int, base=10)
+            data = readrides.read_csv_as_columns(
+                filename, [str, shares, float], cache=True
+            )
+            self.assertEqual(data[0]["shares"], 100)
+            self.assertFalse(os.path.exists(filename + ".colcache"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,17 @@
+import pickle
 import unittest
 from stock import Stock
+from structure import Structure
+
+
+class CompactStock(Structure):
+    _compact = True
+    name = String()
+    shares = PositiveInteger()
+    price = PositiveFloat()
+
+    def sell(self, nshares):
+        self.shares -= nshares
 
 
 class TestStock(unittest.TestCase):
@@ -35,6 +47,8 @@ class TestStock(unittest.TestCase):
         row = Stock.from_row(["GOOG", "100", "490.1"])
 
         self.assertEqual(repr(row), "Stock('GOOG', 100, 490.1)")
+        with self.assertRaises(TypeError):
+            Stock.from_row(["GOOG", "100"])
 
     # Test that the __repr__() method creates a proper representation string.
     def test_repr(self):
@@ -80,5 +94,30 @@ class TestStock(unittest.TestCase):
             s.share = 100
 
 
+class TestCompactStock(unittest.TestCase):
+    def test_create(self):
+        s = CompactStock("GOOG", 100, 490.1)
+        self.assertEqual(s._fields, ("name", "shares", "price"))
+        self.assertEqual(s, CompactStock.from_row(["GOOG", "100", "490.1"]))
+        self.assertFalse(hasattr(s, "__dict__"))
+
+    def test_validation(self):
+        s = CompactStock("GOOG", 100, 490.1)
+        s.sell(25)
+        self.assertEqual(s.shares, 75)
+        with self.assertRaises(ValueError):
+            s.sell(100)
+        with self.assertRaises(TypeError):
+            s.price = "45.23"
+        with self.assertRaises(AttributeError):
+            s.share = 100
+        with self.assertRaises(TypeError):
+            CompactStock("GOOG", "100", 490.1)
+
+    def test_pickle(self):
+        s = CompactStock("GOOG", 100, 490.1)
+        self.assertEqual(pickle.loads(pickle.dumps(s)), s)
+
+
 if __name__ == "__main__":
     unittest.main()
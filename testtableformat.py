@@ -0,0 +1,135 @@
+import io
+import os
+import re
+import unittest
+from unittest import mock
+from array import array
+from collections import namedtuple
+import tableformat
+from readrides import CategoricalColumn, DataCollection
+from stock import Stock
+
+
+class CountingWriter(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, s):
+        self.writes += 1
+        return super().write(s)
+
+
+class TestTableFormat(unittest.TestCase):
+    def setUp(self):
+        self.records = [Stock("AA", 100, 32.2), Stock("IBM", 50, 91.1)] * 50
+        self.fields = ["name", "shares", "price"]
+
+    def test_text_headers_once(self):
+        out = io.StringIO()
+        formatter = tableformat.TextTableFormatter(out=out)
+        tableformat.print_table(self.records, self.fields, formatter)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3 + len(self.records) + 1)
+        self.assertEqual(sum("shares" in line for line in lines), 1)
+
+    def test_batched_writes(self):
+        out = CountingWriter()
+        formatter = tableformat.CSVTableFormatter(out=out, flush_size=200)
+        tableformat.print_table(self.records, self.fields, formatter)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], "name,shares,price")
+        self.assertEqual(lines[2], "AA,100,32.2")
+        self.assertEqual(len(lines), 2 + len(self.records))
+        self.assertGreater(out.writes, 1)
+        self.assertLess(out.writes, len(self.records) // 4)
+
+    def test_streaming(self):
+        out = io.StringIO()
+        formatter = tableformat.HTMLTableFormatter(out=out, flush_size=0)
+        formatter.headings(self.fields)
+        self.assertIn("<thead>", out.getvalue())
+        self.assertIn("<tbody>", out.getvalue())
+        formatter.row(["AA", 100, 32.2])
+        self.assertIn("32.2", out.getvalue())
+        self.assertNotIn("</table>", out.getvalue())
+        formatter.print()
+        self.assertIn("</table>", out.getvalue())
+
+    def test_compiled_rows_match(self):
+        for name in ("text", "csv", "html"):
+            outputs = []
+            for compiled in (False, True):
+                out = io.StringIO()
+                formatter = tableformat.create_formatter(
+                    name, column_formats=['"%s"', "%d", "%0.2f"], out=out
+                )
+                formatter.compile_rows = compiled
+                tableformat.print_table(self.records, self.fields, formatter)
+                outputs.append(out.getvalue())
+            self.assertEqual(outputs[0], outputs[1])
+            self.assertIn('"IBM"', outputs[1])
+
+    def test_stream_starts_with_headers(self):
+        out = io.StringIO()
+        formatter = tableformat.create_formatter("csv", out=out)
+        tableformat.print_table(self.records[:1], self.fields, formatter)
+        self.assertTrue(out.getvalue().startswith("name,shares,price\n"))
+
+    def test_custom_row_kept(self):
+        class Formatter(tableformat.CSVTableFormatter):
+            def row(self, rowdata):
+                self.print_line("row")
+
+        out = io.StringIO()
+        tableformat.print_table(self.records[:2], self.fields, Formatter(out=out))
+        self.assertEqual(out.getvalue().splitlines()[2:], ["row", "row"])
+
+    def test_record_kinds(self):
+        Row = namedtuple("Row", ["price", "name", "shares"])
+        kinds = [
+            [{"name": "AA", "shares": 100, "price": 32.2}],
+            [Stock("AA", 100, 32.2)],
+            [Row(32.2, "AA", 100)],
+            [("AA", 100, 32.2)],
+            DataCollection(
+                {
+                    "shares": array("q", [100]),
+                    "name": CategoricalColumn(["AA"]),
+                    "price": array("d", [32.2]),
+                }
+            ),
+        ]
+        for records in kinds:
+            out = io.StringIO()
+            formatter = tableformat.CSVTableFormatter(out=out)
+            tableformat.print_table(records, self.fields, formatter)
+            self.assertEqual(out.getvalue().splitlines()[2], "AA,100,32.2")
+
+    def test_single_field(self):
+        out = io.StringIO()
+        formatter = tableformat.CSVTableFormatter(out=out)
+        tableformat.print_table(iter(self.records[:2]), ["name"], formatter)
+        self.assertEqual(out.getvalue().splitlines()[2:], ["AA", "IBM"])
+
+    def test_color_detection(self):
+        class Terminal(io.StringIO):
+            def isatty(self):
+                return True
+
+        self.assertFalse(tableformat.use_color(io.StringIO()))
+        self.assertTrue(tableformat.use_color(Terminal()))
+        with mock.patch.dict(os.environ, {"NO_COLOR": "1"}):
+            self.assertFalse(tableformat.use_color(Terminal()))
+
+        for color in (False, True):
+            out = io.StringIO()
+            formatter = tableformat.create_formatter("html", out=out, color=color)
+            tableformat.print_table(self.records[:2], self.fields, formatter)
+            self.assertEqual("\x1b[" in out.getvalue(), color)
+            text = re.sub("\x1b\\[[0-9;]*m", "", out.getvalue())
+            self.assertIn("<td>AA</td>", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import subprocess
+import sys
+import unittest
+from array import array
+from validate import Integer, Positive, PositiveInteger, PositiveFloat, NonEmptyString
+from validate import ColumnError, String, validated, enforce
+from validate import set_validation_mode, validation_stats
+from stock import Stock
+
+
+class Even(Integer):
+    @classmethod
+    def check(cls, value):
+        if value % 2:
+            raise ValueError("Expected even")
+        return super().check(value)
+
+
+class PositiveEven(Even, Positive):
+    pass
+
+
+class TestFastCheck(unittest.TestCase):
+    def test_matches_check(self):
+        for validator, good, bad in [
+            (PositiveInteger, 5, [-1, 2.5, "5"]),
+            (NonEmptyString, "a", ["", 1]),
+            (PositiveEven, 4, [3, -2, "x"]),
+        ]:
+            self.assertEqual(validator.fast_check(good), validator.check(good))
+            for value in bad:
+                with self.assertRaises(Exception) as fast:
+                    validator.fast_check(value)
+                with self.assertRaises(Exception) as slow:
+                    validator.check(value)
+                self.assertIs(type(fast.exception), type(slow.exception))
+                self.assertEqual(str(fast.exception), str(slow.exception))
+
+
+class TestColumnChecks(unittest.TestCase):
+    def test_check_many(self):
+        self.assertEqual(NonEmptyString.check_many(["a", "b"]), ["a", "b"])
+        with self.assertRaises(ColumnError) as cm:
+            NonEmptyString.check_many(["a", "", 3], "name")
+        self.assertEqual(cm.exception.rows, [1, 2])
+        self.assertIsInstance(cm.exception.errors[1][2], TypeError)
+
+    def test_check_column(self):
+        values = array("q", [1, -2, 3, -4])
+        with self.assertRaises(ColumnError) as cm:
+            PositiveInteger.check_column(values)
+        self.assertEqual(cm.exception.rows, [1, 3])
+        self.assertEqual(str(cm.exception.errors[0][2]), "Expected >= 0")
+        with self.assertRaises(ColumnError) as cm:
+            PositiveFloat.check_column(values)
+        self.assertEqual(cm.exception.rows, [0, 1, 2, 3])
+        self.assertEqual(list(PositiveEven.check_column(array("q", [2, 4]))), [2, 4])
+
+    def test_numpy_not_imported(self):
+        code = "import sys, structure; print('numpy' in sys.modules)"
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+class TestDecorators(unittest.TestCase):
+    def test_validated(self):
+        @validated
+        def repeat(
+            text: NonEmptyString, count: PositiveInteger = 2, *, sep: String = ""
+        ) -> String:
+            return sep.join([text] * count)
+
+        self.assertEqual(repeat("ab"), "abab")
+        self.assertEqual(repeat("ab", count=3, sep="-"), "ab-ab-ab")
+        with self.assertRaises(TypeError) as cm:
+            repeat("", -1)
+        self.assertEqual(
+            str(cm.exception),
+            "Bad Arguments\n    text: Must be non-empty\n    count: Expected >= 0",
+        )
+
+    def test_enforce(self):
+        @enforce(x=Integer, return_=Integer)
+        def half(x):
+            return x / 2
+
+        with self.assertRaises(TypeError) as cm:
+            half(4)
+        self.assertEqual(str(cm.exception), "Bad return: Expected <class 'int'>")
+        with self.assertRaises(TypeError):
+            enforce(y=Integer)(lambda x: x)
+
+
+class TestValidationMode(unittest.TestCase):
+    def tearDown(self):
+        set_validation_mode("full")
+
+    def test_off(self):
+        set_validation_mode("off")
+        s = Stock("GOOG", "100", 490.1)
+        s.price = -1
+        self.assertEqual(s.shares, "100")
+        self.assertEqual(validation_stats()["skipped"], 2)
+        self.assertEqual(validation_stats()["executed"], 0)
+
+    def test_sampled(self):
+        set_validation_mode("sampled", every=3)
+        checked = 0
+        for _ in range(9):
+            try:
+                Stock("GOOG", -1, 490.1)
+            except ValueError:
+                checked += 1
+        self.assertEqual(checked, 3)
+        self.assertEqual(validation_stats()["skipped"], 6)
+
+    def test_bad_mode(self):
+        with self.assertRaises(ValueError):
+            set_validation_mode("sometimes")
+
+
+if __name__ == "__main__":
+    unittest.main()
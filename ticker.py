@@ -21,7 +21,7 @@ if __name__ == "__main__":
 
     from tableformat import create_formatter, print_table
 
-    formatter = create_formatter("text")
+    formatter = create_formatter("text", flush_size=0)
 
     lines = follow("Data/stocklog.csv")
     rows = csv.reader(lines)
@@ -1,11 +1,166 @@
+from array import array
 from inspect import signature
-from functools import wraps
+from functools import lru_cache, wraps
+
+
+def check_code(validator, value, clsname):
+    """
+    Return source lines that check value the same way validator.check()
+    does, with the cooperative super() chain flattened in MRO order. The
+    validator class must be available as clsname when the code runs.
+    """
+    if not isinstance(validator, type):
+        validator = type(validator)
+    lines = []
+    for cls in validator.__mro__:
+        if "check" in vars(cls):
+            source = vars(cls).get("check_source")
+            if source is None:
+                return [f"{value} = {clsname}.check({value})"]
+            lines.extend(source.format(value=value, cls=clsname).splitlines())
+    return lines
+
+
+def compile_check(validator):
+    """
+    Compile the full check chain of a validator class into one function
+    """
+    lines = check_code(validator, "value", "cls")
+    code = "def fast_check(value):\n"
+    code += "".join(f"    {line}\n" for line in lines)
+    code += "    return value\n"
+    locs = {"cls": validator}
+    exec(code, locs)
+    return locs["fast_check"]
+
+
+class ValidationSettings:
+    """
+    Process-wide control over how often validation runs. In "full" mode
+    every value is checked, in "sampled" mode one validation in every
+    `every` is run and in "off" mode nothing is checked. executed and
+    skipped count validations since the mode was last set.
+    """
+
+    modes = ("full", "sampled", "off")
+
+    def __init__(self):
+        self.set_mode("full")
+
+    def set_mode(self, mode, every=100):
+        if mode not in self.modes:
+            raise ValueError(f"Unknown validation mode {mode}")
+        if every < 1:
+            raise ValueError("Expected every >= 1")
+        self.mode = mode
+        self.every = every
+        self._countdown = 1
+        self.executed = 0
+        self.skipped = 0
+
+    def should_check(self):
+        """
+        Decide whether the next validation should run
+        """
+        mode = self.mode
+        if mode == "full":
+            self.executed += 1
+            return True
+        if mode == "sampled":
+            self._countdown -= 1
+            if self._countdown == 0:
+                self._countdown = self.every
+                self.executed += 1
+                return True
+        self.skipped += 1
+        return False
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "every": self.every,
+            "executed": self.executed,
+            "skipped": self.skipped,
+        }
+
+
+validation = ValidationSettings()
+
+
+def set_validation_mode(mode, every=100):
+    """
+    Set validation to "full", "sampled" (one in every N) or "off"
+    """
+    validation.set_mode(mode, every)
+
+
+def validation_stats():
+    return validation.stats()
+
+
+class ColumnError(ValueError):
+    """
+    Raised by bulk validation. errors lists every failure as a
+    (row, name, exception) tuple where name is the column, if known.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        lines = [
+            f"    row {row}: {name + ': ' if name else ''}{e}"
+            for row, name, e in errors[:10]
+        ]
+        if len(errors) > 10:
+            lines.append(f"    ... and {len(errors) - 10} more")
+        super().__init__("Bad values\n" + "\n".join(lines))
+
+    @property
+    def rows(self):
+        return sorted({row for row, _, _ in self.errors})
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """
+    Import NumPy the first time a column needs it, so that importing this
+    module stays cheap. Returns None if it isn't installed.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _as_ndarray(values):
+    """
+    Return a NumPy view of an array-like column, or None
+    """
+    numpy = _numpy()
+    if numpy is None:
+        return None
+    if isinstance(values, numpy.ndarray):
+        return values
+    if isinstance(values, array):
+        return numpy.frombuffer(values, values.typecode)
+    if isinstance(values, memoryview):
+        return numpy.frombuffer(values, values.format)
+    return None
+
+
+# Python types of the values held in NumPy arrays of each dtype kind
+_kind_types = {"b": bool, "i": int, "u": int, "f": float}
 
 
 class Validator:
     # Collect all derived classes into a dict
     validators = {}
 
+    # Source code for the test made by this class's own check() method.
+    # {value} names the value being checked and {cls} the validator class.
+    # Classes that override check() without it can't have checks inlined.
+    check_source = ""
+
     def __init__(self, name=None):
         self.name = name
 
@@ -19,13 +174,110 @@ class Validator:
     @classmethod
     def __init_subclass__(cls):
         cls.validators[cls.__name__] = cls
+        cls.fast_check = staticmethod(compile_check(cls))
 
     def __set__(self, instance, value):
-        instance.__dict__[self.name] = self.check(value)
+        if validation.should_check():
+            value = self.fast_check(value)
+        instance.__dict__[self.name] = value
+
+    @classmethod
+    def check_array(cls, values):
+        """
+        Bulk version of this class's own check() for a NumPy array.
+        Returns a boolean mask of failing rows, or None if the check
+        can't be applied to the array as a whole.
+        """
+        return False
+
+    @classmethod
+    def check_many(cls, values, name=None):
+        """
+        Check every value, reporting all failures with one ColumnError
+        """
+        check = cls.fast_check
+        errors = []
+        for row, value in enumerate(values):
+            try:
+                check(value)
+            except Exception as e:
+                errors.append((row, name, e))
+        if errors:
+            raise ColumnError(errors)
+        return values
+
+    @classmethod
+    def _check_symbols(cls, values, name):
+        """
+        Check a dictionary-encoded column once per distinct symbol
+        """
+        failures = {}
+        for code, symbol in enumerate(values.symbols):
+            try:
+                cls.fast_check(symbol)
+            except Exception as e:
+                failures[code] = e
+        errors = [
+            (row, name, failures[code])
+            for row, code in enumerate(values.codes)
+            if code in failures
+        ]
+        if errors:
+            raise ColumnError(errors)
+        return values
+
+    @classmethod
+    def check_column(cls, values, name=None):
+        """
+        Check a whole column. Numeric arrays are checked with vectorized
+        NumPy operations when every check in the chain supports it.
+        """
+        if hasattr(values, "symbols") and hasattr(values, "codes"):
+            return cls._check_symbols(values, name)
+
+        arr = _as_ndarray(values)
+        if arr is None:
+            return cls.check_many(values, name)
+
+        numpy = _numpy()
+        failed = numpy.zeros(len(arr), dtype=bool)
+        for klass in cls.__mro__:
+            if "check" in vars(klass):
+                check_array = vars(klass).get("check_array")
+                bad = (
+                    None if check_array is None else check_array.__get__(None, cls)(arr)
+                )
+                if bad is None:
+                    return cls.check_many(values, name)
+                failed |= bad
+
+        errors = []
+        for row in numpy.flatnonzero(failed).tolist():
+            try:
+                cls.fast_check(arr[row].item())
+            except Exception as e:
+                errors.append((row, name, e))
+        if errors:
+            raise ColumnError(errors)
+        return values
+
+
+Validator.fast_check = staticmethod(compile_check(Validator))
 
 
 class Typed(Validator):
     expected_type = object
+    check_source = (
+        "if not isinstance({value}, {cls}.expected_type):\n"
+        "    raise TypeError(f'Expected {{{cls}.expected_type}}')"
+    )
+
+    @classmethod
+    def check_array(cls, values):
+        kind_type = _kind_types.get(values.dtype.kind)
+        if kind_type is None:
+            return None
+        return not issubclass(kind_type, cls.expected_type)
 
     @classmethod
     def check(cls, value):
@@ -47,6 +299,14 @@ class String(Typed):
 
 
 class Positive(Validator):
+    check_source = "if {value} < 0:\n    raise ValueError('Expected >= 0')"
+
+    @classmethod
+    def check_array(cls, values):
+        if values.dtype.kind not in _kind_types:
+            return None
+        return values < 0
+
     @classmethod
     def check(cls, value):
         if value < 0:
@@ -55,6 +315,8 @@ class Positive(Validator):
 
 
 class NonEmpty(Validator):
+    check_source = "if len({value}) == 0:\n    raise ValueError('Must be non-empty')"
+
     @classmethod
     def check(cls, value):
         if len(value) == 0:
@@ -74,77 +336,106 @@ class NonEmptyString(String, NonEmpty):
     pass
 
 
-def validated(func):
-    sig = signature(func)
+def _add_error(errors, name, e):
+    if errors is None:
+        errors = []
+    errors.append(f"    {name}: {e}")
+    return errors
+
+
+def make_checked_wrapper(func, annotations, retcheck=None):
+    """
+    Generate a wrapper for func that checks arguments against the
+    validators in annotations and the result against retcheck. The
+    wrapper has the same parameters as func, so Python binds the
+    arguments itself and no Signature.bind() is needed per call.
+    """
+    params = list(signature(func).parameters.values())
+    names = [p.name for p in params]
+    for name in annotations:
+        if name not in names:
+            raise TypeError(f"{func.__qualname__}() has no parameter {name}")
+
+    locs = {"_vf_func": func, "_vf_add_error": _add_error, "_vf_ret": retcheck}
+    args = []
+    call = []
+    for n, p in enumerate(params):
+        if p.kind == p.KEYWORD_ONLY and "*" not in "".join(args):
+            args.append("*")
+        arg = p.name
+        if p.default is not p.empty:
+            locs[f"_vf_d{n}"] = p.default
+            arg += f"=_vf_d{n}"
+        if p.kind == p.VAR_POSITIONAL:
+            arg = call_arg = f"*{p.name}"
+        elif p.kind == p.VAR_KEYWORD:
+            arg = call_arg = f"**{p.name}"
+        elif p.kind == p.KEYWORD_ONLY:
+            call_arg = f"{p.name}={p.name}"
+        else:
+            call_arg = p.name
+        args.append(arg)
+        call.append(call_arg)
+        if p.kind == p.POSITIONAL_ONLY and (
+            n + 1 == len(params) or params[n + 1].kind != p.POSITIONAL_ONLY
+        ):
+            args.append("/")
+
+    locs["_vf_should_check"] = validation.should_check
+    lines = [
+        f"def wrapper({', '.join(args)}):",
+        "    _vf_errors = None",
+        "    _vf_checking = _vf_should_check()",
+    ]
+    if annotations:
+        lines.append("    if _vf_checking:")
+    for n, (name, validator) in enumerate(annotations.items()):
+        if hasattr(validator, "fast_check"):
+            locs[f"_vf_c{n}"] = validator.fast_check
+            check = f"_vf_c{n}({name})"
+        else:
+            # Not a validator, so fail when called as the lookup would
+            locs[f"_vf_v{n}"] = validator
+            check = f"_vf_v{n}.fast_check({name})"
+        lines += [
+            "        try:",
+            f"            {check}",
+            "        except Exception as _vf_e:",
+            f"            _vf_errors = _vf_add_error(_vf_errors, {name!r}, _vf_e)",
+        ]
+    lines += [
+        "    if _vf_errors:",
+        "        raise TypeError('Bad Arguments\\n' + '\\n'.join(_vf_errors))",
+        f"    _vf_result = _vf_func({', '.join(call)})",
+    ]
+    if retcheck:
+        lines += [
+            "    if _vf_checking:",
+            "        try:",
+            "            _vf_ret.fast_check(_vf_result)",
+            "        except Exception as _vf_e:",
+            "            raise TypeError(f'Bad return: {_vf_e}') from None",
+        ]
+    lines.append("    return _vf_result")
+    exec("\n".join(lines), locs)
+    return wraps(func)(locs["wrapper"])
+
 
+def validated(func):
     # Gather the function annotations
     annotations = dict(func.__annotations__)
 
     # Get the return annotation (if any)
     retcheck = annotations.pop("return", None)
 
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        bound = sig.bind(*args, *kwargs)
-        errors = []
-
-        # Enforce argument checks
-        for name, validator in annotations.items():
-            try:
-                validator.check(bound.arguments[name])
-            except Exception as e:
-                errors.append(f"    {name}: {e}")
-
-        if errors:
-            raise TypeError("Bad Arguments\n" + "\n".join(errors))
-
-        for name, val in annotations.items():
-            val.check(bound.arguments[name])
-
-        result = func(*args, **kwargs)
-
-        # Enforce return check (if any)
-        if retcheck:
-            try:
-                retcheck.check(result)
-            except Exception as e:
-                raise TypeError(f"Bad return: {e}") from None
-        return result
-
-    return wrapper
+    return make_checked_wrapper(func, annotations, retcheck)
 
 
 def enforce(**annotations):
     retcheck = annotations.pop("return_", None)
 
     def decorate(func):
-        sig = signature(func)
-
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            bound = sig.bind(*args, **kwargs)
-            errors = []
-
-            # Enforce argument checks
-            for name, validator in annotations.items():
-                try:
-                    validator.check(bound.arguments[name])
-                except Exception as e:
-                    errors.append(f"    {name}: {e}")
-
-            if errors:
-                raise TypeError("Bad Arguments\n" + "\n".join(errors))
-
-            result = func(*args, **kwargs)
-
-            if retcheck:
-                try:
-                    retcheck.check(result)
-                except Exception as e:
-                    raise TypeError(f"Bad return: {e}") from None
-            return result
-
-        return wrapper
+        return make_checked_wrapper(func, annotations, retcheck)
 
     return decorate
 